@@ -0,0 +1,255 @@
+"""Ресурсы игры в одном файле.
+
+В начале файла лежит индекс: имя, формат, смещение и размер каждого ресурса,
+за ним сами файлы подряд. Пакет открывается через mmap, и get(name) отдает
+срез памяти без копирования. Имена совпадают с относительными путями
+("images/wall.png"), поэтому загрузчики просят ресурс по тому же пути, что и
+раньше; если пакета нет или ресурса в нем нет, читается обычный файл.
+
+Сборка: python assets_pack.py [--output assets.pack] [папки...]
+"""
+import argparse
+import io
+import mmap
+import os
+import struct
+import sys
+
+from PIL import Image
+
+# В сборке PyInstaller --onefile данные распаковываются в sys._MEIPASS,
+# а не в текущую папку
+BASE_DIR = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+PACK_FILE = os.path.join(BASE_DIR, "assets.pack")
+# Папка кэшей собранной игры в профиле пользователя
+USER_CACHE_NAME = "EscapeTheCastle"
+PACK_DIRS = ("images", "assets", "music", "baked")
+FORMAT_VERSION = 1
+MAGIC = b"ETCP"
+ALIGNMENT = 16
+
+HEADER = struct.Struct("<4sHI")
+ENTRY = struct.Struct("<QQ")
+
+
+class PackFormatError(Exception):
+    pass
+
+
+def asset_name(path):
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def _pack_str(out, value):
+    raw = value.encode("utf-8")
+    out += struct.pack("<H", len(raw))
+    out += raw
+
+
+def _unpack_str(buf, offset):
+    (length,) = struct.unpack_from("<H", buf, offset)
+    offset += 2
+    return bytes(buf[offset:offset + length]).decode("utf-8"), offset + length
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def collect_files(directories):
+    """Файлы папок ресурсов в виде путей относительно BASE_DIR"""
+    files = []
+    for directory in directories:
+        for root, dirs, names in os.walk(resource_path(directory)):
+            dirs.sort()
+            for name in sorted(names):
+                files.append(os.path.relpath(os.path.join(root, name), BASE_DIR))
+    return files
+
+
+def build_pack(paths, output=PACK_FILE):
+    """Пишет пакет из файлов paths; имена ресурсов - нормализованные относительные пути"""
+    entries = []
+    for path in paths:
+        with open(resource_path(path), "rb") as f:
+            data = f.read()
+        fmt = os.path.splitext(path)[1].lstrip(".").lower()
+        entries.append((asset_name(path), fmt, data))
+
+    index = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, len(entries)))
+    index_size = len(index)
+    for name, fmt, data in entries:
+        index_size += 2 + len(name.encode("utf-8")) + 2 + len(fmt.encode("utf-8")) + ENTRY.size
+
+    offset = _aligned(index_size)
+    offsets = []
+    for name, fmt, data in entries:
+        offsets.append(offset)
+        _pack_str(index, name)
+        _pack_str(index, fmt)
+        index += ENTRY.pack(offset, len(data))
+        offset = _aligned(offset + len(data))
+
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(index)
+        for (name, fmt, data), entry_offset in zip(entries, offsets):
+            f.write(b"\0" * (entry_offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, output)
+    return len(entries)
+
+
+class SliceReader(io.RawIOBase):
+    """Файловый объект поверх среза пакета, для PIL и декодеров звука"""
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.view[self.position:self.position + len(buffer)]
+        size = len(chunk)
+        buffer[:size] = chunk
+        self.position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, min(offset, len(self.view)))
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+class AssetPack:
+    def __init__(self, path=PACK_FILE):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        self.entries = {}
+        try:
+            self.read_index()
+        except (struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise PackFormatError(f"{path}: {e}")
+
+    def read_index(self):
+        magic, version, count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise PackFormatError(f"{self.path}: неверная сигнатура пакета")
+        if version != FORMAT_VERSION:
+            raise PackFormatError(f"{self.path}: неподдерживаемая версия пакета: {version}")
+        offset = HEADER.size
+        for _ in range(count):
+            name, offset = _unpack_str(self.map, offset)
+            fmt, offset = _unpack_str(self.map, offset)
+            entry_offset, size = ENTRY.unpack_from(self.map, offset)
+            offset += ENTRY.size
+            self.entries[name] = (entry_offset, size, fmt)
+
+    def __contains__(self, name):
+        return asset_name(name) in self.entries
+
+    def names(self):
+        return list(self.entries)
+
+    def format(self, name):
+        return self.entries[asset_name(name)][2]
+
+    def get(self, name):
+        """Содержимое ресурса как memoryview над отображенным файлом, без копирования"""
+        offset, size, fmt = self.entries[asset_name(name)]
+        return self.view[offset:offset + size]
+
+    def open(self, name):
+        return io.BufferedReader(SliceReader(self.get(name)))
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+
+_pack = None
+_pack_checked = False
+
+
+def get_pack():
+    """Пакет ресурсов рядом с игрой или None, если его нет"""
+    global _pack, _pack_checked
+    if not _pack_checked:
+        _pack_checked = True
+        if os.path.exists(PACK_FILE):
+            try:
+                _pack = AssetPack(PACK_FILE)
+            except (OSError, PackFormatError) as e:
+                print(f"Пакет ресурсов не загружен: {e}")
+    return _pack
+
+
+def resource_path(name):
+    """Путь к файлу ресурса на диске относительно папки игры"""
+    return os.path.join(BASE_DIR, name)
+
+
+def cache_dir(name):
+    """Папка кэша: рядом с игрой, а в сборке PyInstaller, где BASE_DIR временный, - у пользователя"""
+    if not hasattr(sys, "_MEIPASS"):
+        return os.path.join(BASE_DIR, name)
+    root = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(root, USER_CACHE_NAME, name.lstrip("."))
+
+
+def exists(name):
+    pack = get_pack()
+    return (pack is not None and name in pack) or os.path.exists(resource_path(name))
+
+
+def read_bytes(name):
+    """Содержимое ресурса: срез пакета или байты файла с диска"""
+    pack = get_pack()
+    if pack is not None and name in pack:
+        return pack.get(name)
+    with open(resource_path(name), "rb") as f:
+        return f.read()
+
+
+def open_asset(name):
+    pack = get_pack()
+    if pack is not None and name in pack:
+        return pack.open(name)
+    return open(resource_path(name), "rb")
+
+
+def open_image(name):
+    pack = get_pack()
+    if pack is not None and name in pack:
+        return Image.open(pack.open(name))
+    return Image.open(resource_path(name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка пакета ресурсов")
+    parser.add_argument("directories", nargs="*", default=list(PACK_DIRS))
+    parser.add_argument("--output", default=PACK_FILE)
+    args = parser.parse_args()
+    files = collect_files(args.directories)
+    count = build_pack(files, args.output)
+    print(f"{args.output}: {count} файлов, {os.path.getsize(args.output)} байт")
+
+
+if __name__ == "__main__":
+    main()
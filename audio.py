@@ -0,0 +1,179 @@
+"""Загрузка звука без задержки первого кадра.
+
+Короткие эффекты декодируются в PCM в фоновом потоке, а результат сохраняется
+на диск в AUDIO_CACHE_DIR под хешем исходного файла: при следующем запуске
+MP3 уже не нужно декодировать. Пока звук не готов, get() возвращает None,
+и звук пропускается. Фоновая музыка не декодируется целиком, а читается
+из файла потоком. Файлы берутся из пакета ресурсов, если он собран.
+"""
+import hashlib
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import arcade
+import pyglet.media as media
+from pyglet.media.codecs.base import AudioFormat, StaticMemorySource, StaticSource
+
+import assets_pack
+
+AUDIO_CACHE_DIR = assets_pack.cache_dir(".audio_cache")
+AUDIO_CACHE_VERSION = 1
+MAGIC = b"ETCA"
+
+HEADER = struct.Struct("<4sHBBI5s")
+READ_SIZE = 1 << 16
+
+
+class DecodedSource(StaticSource):
+    """Уже декодированный PCM; как и StaticSource, его можно играть на нескольких плеерах"""
+
+    def __init__(self, data, audio_format):
+        # StaticSource забирает данные из источника; из памяти это одно копирование без декодирования
+        super().__init__(StaticMemorySource(data, audio_format))
+
+
+class DecodedSound(arcade.Sound):
+    """arcade.Sound поверх готового PCM, без повторного чтения файла"""
+
+    def __init__(self, file_name, source):
+        # arcade.Sound.__init__ только проверяет, что файл есть на диске, и загружает его
+        # через media.load, а звук из пакета или кэша уже декодирован. Остальные поля
+        # базового класса - те же три, что заполняются здесь
+        self.file_name = file_name
+        self.source = source
+        self.min_distance = 100000000
+
+
+def cache_path(raw):
+    digest = hashlib.sha1(raw)
+    digest.update(struct.pack("<H", AUDIO_CACHE_VERSION))
+    return os.path.join(AUDIO_CACHE_DIR, digest.hexdigest() + ".pcm")
+
+
+def decode(path):
+    source = media.load(path, file=assets_pack.open_asset(path), streaming=True)
+    audio_format = source.audio_format
+    if audio_format is None:
+        raise ValueError(f"{path}: нет звуковой дорожки")
+    chunks = []
+    while True:
+        audio_data = source.get_audio_data(READ_SIZE)
+        if audio_data is None:
+            break
+        chunks.append(bytes(audio_data.data))
+    return b"".join(chunks), audio_format
+
+
+def pack_pcm(data, audio_format):
+    header = HEADER.pack(
+        MAGIC, AUDIO_CACHE_VERSION, audio_format.channels, audio_format.sample_size,
+        audio_format.sample_rate, audio_format.sample_type.encode("ascii")
+    )
+    return header + data
+
+
+def unpack_pcm(buf):
+    magic, version, channels, sample_size, sample_rate, sample_type = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != AUDIO_CACHE_VERSION:
+        raise ValueError("Неверный заголовок кэша звука")
+    audio_format = AudioFormat(channels, sample_size, sample_rate, sample_type.rstrip(b"\0").decode("ascii"))
+    return bytes(buf[HEADER.size:]), audio_format
+
+
+def load_pcm(path):
+    """Возвращает DecodedSource из дискового кэша, а при промахе декодирует файл и обновляет кэш"""
+    raw = assets_pack.read_bytes(path)
+    cached = cache_path(raw)
+    if os.path.exists(cached):
+        try:
+            with open(cached, "rb") as f:
+                return DecodedSource(*unpack_pcm(f.read()))
+        except (OSError, struct.error, ValueError):
+            pass
+
+    data, audio_format = decode(path)
+    try:
+        os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+        tmp_path = cached + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pack_pcm(data, audio_format))
+        os.replace(tmp_path, cached)
+    except OSError:
+        pass
+    return DecodedSource(data, audio_format)
+
+
+class SoundBank:
+    """Короткие звуки по именам; декодируются в фоне, пока игра уже работает"""
+
+    def __init__(self):
+        self.loader = ThreadPoolExecutor(max_workers=1)
+        self.pending = {}
+        self.sounds = {}
+
+    def preload(self, files):
+        for name, path in files.items():
+            if name in self.sounds or name in self.pending:
+                continue
+            if not assets_pack.exists(path):
+                continue
+            self.pending[name] = self.loader.submit(load_pcm, path)
+
+    def get(self, name):
+        sound = self.sounds.get(name)
+        if sound is not None:
+            return sound
+        future = self.pending.get(name)
+        if future is None or not future.done():
+            return None
+        del self.pending[name]
+        try:
+            source = future.result()
+        except Exception as e:
+            print(f"Не удалось загрузить звук {name}: {e}")
+            return None
+        sound = DecodedSound(name, source)
+        self.sounds[name] = sound
+        return sound
+
+    def shutdown(self):
+        self.loader.shutdown(wait=False, cancel_futures=True)
+
+
+class MusicStream:
+    """Фоновая музыка, которая читается из файла по частям и играет по кругу"""
+
+    def __init__(self, path):
+        self.path = path
+        self.player = None
+
+    @property
+    def playing(self):
+        return self.player is not None
+
+    def play(self, volume=1.0):
+        if self.player is not None or not assets_pack.exists(self.path):
+            return None
+        try:
+            source = media.load(self.path, file=assets_pack.open_asset(self.path), streaming=True)
+        except Exception as e:
+            print(f"Не удалось открыть музыку {self.path}: {e}")
+            return None
+        player = media.Player()
+        player.volume = volume
+        player.loop = True
+        player.queue(source)
+        player.play()
+        self.player = player
+        return player
+
+    def set_volume(self, volume):
+        if self.player is not None:
+            self.player.volume = volume
+
+    def stop(self):
+        if self.player is not None:
+            self.player.pause()
+            self.player.delete()
+            self.player = None
@@ -0,0 +1,150 @@
+from array import array
+
+import arcade
+from arcade.gl import BufferDescription
+
+from textures import textures
+
+VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_vert;
+out vec2 v_pos;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_vert, 0.0, 1.0);
+    v_pos = in_vert;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+uniform sampler2D layer_texture;
+uniform vec2 origin;
+uniform vec2 tile_size;
+
+in vec2 v_pos;
+out vec4 f_color;
+
+void main() {
+    f_color = texture(layer_texture, (v_pos - origin) / tile_size);
+}
+"""
+
+
+class TexturedQuad:
+    """Один прямоугольник в мировых координатах, текстура повторяется с шагом tile_size"""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.program = ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+        self.buffer = ctx.buffer(reserve=4 * 2 * 4)
+        self.geometry = ctx.geometry(
+            [BufferDescription(self.buffer, "2f", ["in_vert"])],
+            mode=ctx.TRIANGLE_STRIP
+        )
+
+    def draw(self, texture, left, right, bottom, top, origin, tile_size, blend_func=None):
+        """Рисует прямоугольник со смешиванием; по умолчанию обычный alpha blending"""
+        self.buffer.write(array("f", [
+            left, top,
+            left, bottom,
+            right, top,
+            right, bottom,
+        ]))
+        texture.use(0)
+        self.program["layer_texture"] = 0
+        self.program["origin"] = origin
+        self.program["tile_size"] = tile_size
+        ctx = self.ctx
+        # arcade выключает смешивание после каждой отрисовки списков спрайтов и фигур
+        previous_blend = ctx.blend_func
+        ctx.blend_func = blend_func or ctx.BLEND_DEFAULT
+        try:
+            with ctx.enabled(ctx.BLEND):
+                self.geometry.render(self.program)
+        finally:
+            ctx.blend_func = previous_blend
+
+
+_quads = {}
+
+
+def get_quad(ctx):
+    quad = _quads.get(id(ctx))
+    if quad is None:
+        quad = TexturedQuad(ctx)
+        _quads[id(ctx)] = quad
+    return quad
+
+
+def camera_bounds(camera):
+    half_w = camera.viewport_width / 2 / camera.zoom
+    half_h = camera.viewport_height / 2 / camera.zoom
+    x, y = camera.position
+    return x - half_w, x + half_w, y - half_h, y + half_h
+
+
+def visible_bounds(camera, world_bounds):
+    cam_left, cam_right, cam_bottom, cam_top = camera_bounds(camera)
+    world_left, world_right, world_bottom, world_top = world_bounds
+    left = max(cam_left, world_left)
+    right = min(cam_right, world_right)
+    bottom = max(cam_bottom, world_bottom)
+    top = min(cam_top, world_top)
+    if left >= right or bottom >= top:
+        return None
+    return left, right, bottom, top
+
+
+class BackgroundLayer:
+    def __init__(self, filename, tile_scale=1.0, parallax=1.0):
+        self.filename = filename
+        self.tile_scale = tile_scale
+        # 1.0 - слой неподвижен относительно мира, 0.0 - движется вместе с камерой
+        self.parallax = parallax
+
+    def draw(self, quad, camera, visible):
+        texture = textures.get_repeating(self.filename)
+        # Запеченная текстура уже уменьшена, размер тайла считается от исходной картинки
+        bake_x, bake_y = textures.bake_scale(self.filename)
+        tile_size = (texture.width * self.tile_scale / bake_x, texture.height * self.tile_scale / bake_y)
+        left, right, bottom, top = visible
+
+        cam_x, cam_y = camera.position
+        shift = 1.0 - self.parallax
+        origin = (cam_x * shift, cam_y * shift)
+        quad.draw(texture, left, right, bottom, top, origin, tile_size)
+
+
+class Background:
+    """Фон уровня: по одному текстурированному прямоугольнику на слой, обрезанному по камере"""
+
+    def __init__(self, world_bounds, color=arcade.color.SKY_BLUE):
+        self.world_bounds = world_bounds
+        self.color = color
+        self.layers = []
+
+    def add_layer(self, filename, tile_scale=1.0, parallax=1.0):
+        self.layers.append(BackgroundLayer(filename, tile_scale, parallax))
+
+    def clear(self):
+        self.layers.clear()
+
+    def draw(self, camera):
+        visible = visible_bounds(camera, self.world_bounds)
+        if visible is None:
+            return
+        # Сплошная заливка под слоями видна там, где у фона есть прозрачность
+        arcade.draw_lrbt_rectangle_filled(*visible, self.color)
+        if not self.layers:
+            return
+        quad = get_quad(arcade.get_window().ctx)
+        for layer in self.layers:
+            layer.draw(quad, camera, visible)
@@ -0,0 +1,194 @@
+"""Запекание текстур под их размер на экране.
+
+Многие картинки рисуются сильно уменьшенными: wall.png 736x736 стоит в уровне
+с масштабом 0.1. Сборка проходит по всем уровням, для каждой текстуры берет
+наибольший масштаб, с которым она встречается, и сохраняет уменьшенную копию
+в BAKED_DIR. Для слоев фона, которые рисуются своим шейдером, дополнительно
+пишется цепочка mipmap-уровней. Манифест связывает исходный путь с запеченным
+файлом, его размером и размером оригинала; загрузчик берет запеченную копию
+и делит масштаб спрайта на фактическое отношение размеров по каждой оси
+(размеры округляются до пикселя), так что на экране размер не меняется.
+Текстуры, которые нигде не уменьшаются, не запекаются.
+
+Пути в уровнях и манифесте - имена ресурсов относительно папки игры
+(assets_pack.BASE_DIR), поэтому сборку можно запускать из любой папки. Если
+уровень ссылается на отсутствующий файл, сборка останавливается с BakeError.
+
+Сборка: python bake.py
+"""
+import argparse
+import hashlib
+import json
+import os
+
+from PIL import Image
+
+import assets_pack
+from level_format import LAYERS, list_levels, load_level
+
+BAKED_DIR = "baked"
+MANIFEST_FILE = BAKED_DIR + "/manifest.json"
+MANIFEST_PATH = assets_pack.resource_path(MANIFEST_FILE)
+MANIFEST_VERSION = 2
+MIN_MIP_SIZE = 4
+
+
+class BakeError(Exception):
+    pass
+
+
+def display_scales(level_paths):
+    """Наибольший масштаб каждой текстуры по всем уровням и множество файлов фона"""
+    scales = {}
+    backgrounds = set()
+    for path in level_paths:
+        data = load_level(path)
+        for filename, tile_scale, parallax in data.background:
+            scales[filename] = max(scales.get(filename, 0.0), tile_scale)
+            backgrounds.add(filename)
+        for layer in LAYERS:
+            for texture, scale, coords in data.groups(layer):
+                scales[texture] = max(scales.get(texture, 0.0), scale)
+        for kind, frames, scale, entity_path, speed, coords in data.entities:
+            for texture in frames:
+                scales[texture] = max(scales.get(texture, 0.0), scale)
+    return scales, backgrounds
+
+
+def baked_path(path, level=0):
+    root, ext = os.path.splitext(assets_pack.asset_name(path))
+    suffix = f".mip{level}" if level else ""
+    return f"{BAKED_DIR}/{root}{suffix}.png"
+
+
+def resample(image, scale):
+    width, height = image.size
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(size, Image.Resampling.LANCZOS)
+
+
+def mip_chain(image):
+    """Уровни 1, 2, ... с размерами как у glGenerateMipmap: каждый вдвое меньше предыдущего"""
+    levels = []
+    width, height = image.size
+    while max(width, height) > MIN_MIP_SIZE:
+        width, height = max(1, width // 2), max(1, height // 2)
+        levels.append(image.resize((width, height), Image.Resampling.LANCZOS))
+    return levels
+
+
+def save_png(image, name):
+    path = assets_pack.resource_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    image.save(tmp_path, format="PNG", optimize=True)
+    os.replace(tmp_path, path)
+
+
+def source_hash(path):
+    with open(assets_pack.resource_path(path), "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def bake_texture(path, scale, with_mipmaps, previous=None):
+    """Запекает одну текстуру и возвращает запись манифеста"""
+    digest = source_hash(path)
+    output = baked_path(path)
+    if (previous is not None and previous.get("source") == digest
+            and previous.get("scale") == scale
+            and bool(previous.get("mipmaps")) == with_mipmaps
+            and all(os.path.exists(assets_pack.resource_path(name))
+                    for name in [output] + previous.get("mipmaps", []))):
+        return previous
+
+    with Image.open(assets_pack.resource_path(path)) as image:
+        source_size = image.size
+        image = resample(image.convert("RGBA"), scale)
+    save_png(image, output)
+    entry = {"file": output, "scale": scale, "size": list(image.size),
+             "source_size": list(source_size), "source": digest}
+    if with_mipmaps:
+        mipmaps = []
+        for level, mip in enumerate(mip_chain(image), 1):
+            mip_path = baked_path(path, level)
+            save_png(mip, mip_path)
+            mipmaps.append(mip_path)
+        entry["mipmaps"] = mipmaps
+    return entry
+
+
+def read_manifest_file(path=MANIFEST_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("textures", {})
+
+
+def bake(level_paths, output=MANIFEST_PATH):
+    scales, backgrounds = display_scales(level_paths)
+    missing = [path for path in sorted(scales) if not os.path.exists(assets_pack.resource_path(path))]
+    if missing:
+        raise BakeError(f"Нет исходных текстур в {assets_pack.BASE_DIR}: {', '.join(missing)}")
+    previous = read_manifest_file(output)
+    entries = {}
+    for path in sorted(scales):
+        scale = scales[path]
+        if scale >= 1.0:
+            continue
+        entries[path] = bake_texture(path, scale, path in backgrounds, previous.get(path))
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "textures": entries}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, output)
+    return entries
+
+
+_manifest = None
+
+
+def load_manifest():
+    """Записи манифеста, у которых есть запеченный файл; без манифеста - пустой словарь"""
+    global _manifest
+    if _manifest is None:
+        manifest = {}
+        if assets_pack.exists(MANIFEST_FILE):
+            try:
+                data = json.loads(bytes(assets_pack.read_bytes(MANIFEST_FILE)))
+            except (OSError, json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"Манифест запеченных текстур не загружен: {e}")
+                data = {}
+            if data.get("version") == MANIFEST_VERSION:
+                for path, entry in data.get("textures", {}).items():
+                    files = [entry["file"]] + entry.get("mipmaps", [])
+                    if all(assets_pack.exists(name) for name in files):
+                        manifest[path] = entry
+        _manifest = manifest
+    return _manifest
+
+
+def baked_entry(path):
+    return load_manifest().get(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запекание текстур уровней под размер на экране")
+    parser.add_argument("levels", nargs="*")
+    parser.add_argument("--output", default=MANIFEST_PATH)
+    args = parser.parse_args()
+    try:
+        entries = bake(args.levels or list_levels(), args.output)
+    except BakeError as e:
+        raise SystemExit(e)
+    for path, entry in entries.items():
+        width, height = entry["size"]
+        print(f"{path}: x{entry['scale']:g} -> {entry['file']} {width}x{height}")
+
+
+if __name__ == "__main__":
+    main()
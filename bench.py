@@ -0,0 +1,307 @@
+"""Замер времени кадра по уровням без участия игрока.
+
+Каждый уровень проигрывается по одному и тому же сценарию ввода (встроенному
+или из файла записи game.py --record) заданное число кадров. Для on_update и
+on_draw считаются среднее, p95 и p99, а также число спрайтов и вызовов
+отрисовки. Результат пишется в JSON; с --baseline он сравнивается с прошлым
+замером, и при замедлении больше допуска скрипт завершается с кодом 1.
+
+С --check-static скрипт вместо замера сравнивает попиксельно кэш статичных
+слоев с прямой отрисовкой тех же спрайтов в нескольких положениях камеры и
+завершается с кодом 1, если расхождение больше STATIC_TOLERANCE.
+
+Без дисплея: python bench.py --headless --software
+(ARCADE_HEADLESS и программный рендер Mesa llvmpipe).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from quality import PINNED_QUALITY, TIER_ORDER
+
+DEFAULT_FRAMES = 600
+DEFAULT_WARMUP = 60
+DEFAULT_TOLERANCE = 0.10
+SEED = 1
+# Кэш рисует куски с линейной фильтрацией, поэтому небольшое расхождение допустимо;
+# ошибка в смешивании дает разницу в сотни единиц
+STATIC_TOLERANCE = 24
+# Положения камеры для --check-static как доля размера мира
+STATIC_VIEWS = ((0.0, 0.0), (0.5, 0.0), (1.0, 0.0), (0.25, 1.0), (0.75, 1.0))
+
+METRICS = ("update_ms", "draw_ms")
+STATS = ("mean", "p95", "p99")
+
+# Сценарий по умолчанию: (кадр, нажатие или отпускание, клавиша)
+SCRIPT = (
+    (0, "press", "RIGHT"),
+    (40, "press", "SPACE"),
+    (52, "release", "SPACE"),
+    (120, "press", "SPACE"),
+    (125, "release", "SPACE"),
+    (200, "release", "RIGHT"),
+    (200, "press", "LEFT"),
+    (260, "press", "SPACE"),
+    (280, "release", "SPACE"),
+    (320, "press", "UP"),
+    (380, "release", "UP"),
+    (380, "release", "LEFT"),
+    (380, "press", "RIGHT"),
+)
+SCRIPT_LENGTH = 400
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Замер времени кадра по уровням")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP,
+                        help="первые кадры уровня не учитываются")
+    parser.add_argument("--replay", metavar="FILE", help="сценарий ввода из файла записи")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--baseline", metavar="FILE", help="сравнить с прошлым результатом")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="допустимое замедление, доля от базового значения")
+    parser.add_argument("--headless", action="store_true", help="без окна (ARCADE_HEADLESS)")
+    parser.add_argument("--software", action="store_true", help="программный OpenGL (llvmpipe)")
+    parser.add_argument("--quality", choices=TIER_ORDER, default=PINNED_QUALITY,
+                        help="фиксированный уровень эффектов на время замера")
+    parser.add_argument("--check-static", action="store_true",
+                        help="сравнить кэш статичных слоев с прямой отрисовкой")
+    return parser.parse_args()
+
+
+def script_events(key_module, frames):
+    """Встроенный сценарий, повторенный на нужное число кадров"""
+    events = []
+    for start in range(0, frames, SCRIPT_LENGTH):
+        for frame, action, key in SCRIPT:
+            if start + frame < frames:
+                kind = 0 if action == "press" else 1
+                events.append((start + frame, kind, getattr(key_module, key)))
+        # Отпускаем все клавиши перед повтором, чтобы сценарий начинался с чистого листа
+        for key in ("LEFT", "RIGHT", "UP", "SPACE"):
+            events.append((start + SCRIPT_LENGTH - 1, 1, getattr(key_module, key)))
+    return events
+
+
+class DrawCallCounter:
+    """Считает вызовы glDraw*, через которые рисует arcade.gl"""
+
+    NAMES = ("glDrawArrays", "glDrawElements", "glDrawArraysInstanced", "glDrawElementsInstanced")
+
+    def __init__(self, gl):
+        self.count = 0
+        for name in self.NAMES:
+            original = getattr(gl, name, None)
+            if original is not None:
+                setattr(gl, name, self.wrap(original))
+
+    def wrap(self, function):
+        def counted(*args):
+            self.count += 1
+            return function(*args)
+        return counted
+
+    def reset(self):
+        self.count = 0
+
+
+def summarize(samples):
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"mean": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"mean": statistics.fmean(samples), "p95": cuts[94], "p99": cuts[98]}
+
+
+def sprite_count(game):
+    level = game.current_level
+    count = sum(len(sprites) for sprites in level.sprite_lists())
+    count += len(game.player_list)
+    return count + len(game.effects.particles)
+
+
+def run_level(game, index, events, seed, frames, warmup, counter):
+    from replay import Replay
+    from simulation import TICK_DT
+
+    game.playback = None
+    game.game_completed = False
+    game.switch_to_level(index)
+    game.effects.reseed(seed)
+    game.tick_count = 0
+    game.playback = Replay(seed, index, list(events))
+
+    update_times = []
+    draw_times = []
+    draw_calls = []
+    sprites = 0
+    ctx = game.ctx
+    for frame in range(frames):
+        start = time.perf_counter()
+        game.on_update(TICK_DT)
+        updated = time.perf_counter()
+
+        counter.reset()
+        game.on_draw()
+        ctx.finish()
+        drawn = time.perf_counter()
+        game.flip()
+
+        if frame < warmup:
+            continue
+        update_times.append((updated - start) * 1000)
+        draw_times.append((drawn - updated) * 1000)
+        draw_calls.append(counter.count)
+        sprites = max(sprites, sprite_count(game))
+
+    return {
+        "path": game.level_paths[index],
+        "update_ms": summarize(update_times),
+        "draw_ms": summarize(draw_times),
+        "draw_calls": statistics.fmean(draw_calls) if draw_calls else 0,
+        "max_sprites": sprites,
+        "final_level": game.current_level_index,
+    }
+
+
+def render_static(game, position, cached):
+    """Статичные слои текущего уровня в отдельном буфере: через кэш или напрямую"""
+    import arcade
+    from arcade.camera import Camera2D
+
+    ctx = game.ctx
+    level = game.current_level
+    width, height = game.get_size()
+    framebuffer = ctx.framebuffer(color_attachments=[ctx.texture((width, height), components=4)])
+    camera = Camera2D(viewport=arcade.LBWH(0, 0, width, height), position=position,
+                      render_target=framebuffer)
+    static_layers = level.static_layers
+    if cached and not static_layers.valid:
+        static_layers.build(ctx)
+    with camera.activate():
+        framebuffer.clear(color=(*level.level_color, 255))
+        if cached:
+            static_layers.draw(camera)
+        else:
+            for sprites in static_layers.layers:
+                sprites.draw()
+    pixels = np.frombuffer(framebuffer.read(components=3), np.uint8)
+    return pixels.astype(np.int16)
+
+
+def check_static(game, index):
+    """Наибольшая разница каналов между кэшем и прямой отрисовкой по всем STATIC_VIEWS"""
+    from simulation import WORLD_LEFT, WORLD_RIGHT, WORLD_BOTTOM, WORLD_TOP
+
+    game.switch_to_level(index)
+    width, height = game.get_size()
+    worst = 0
+    for fx, fy in STATIC_VIEWS:
+        x = WORLD_LEFT + width / 2 + (WORLD_RIGHT - WORLD_LEFT - width) * fx
+        y = WORLD_BOTTOM + height / 2 + (WORLD_TOP - WORLD_BOTTOM - height) * fy
+        cached = render_static(game, (x, y), True)
+        direct = render_static(game, (x, y), False)
+        worst = max(worst, int(np.abs(cached - direct).max()))
+    return worst
+
+
+def compare(results, baseline, tolerance):
+    """Печатает отличия от базового замера и возвращает список замедлений"""
+    regressions = []
+    for name, level in results["levels"].items():
+        base = baseline.get("levels", {}).get(name)
+        if base is None:
+            print(f"{name}: нет в базовом замере")
+            continue
+        for metric in METRICS:
+            for stat in STATS:
+                old = base[metric][stat]
+                new = level[metric][stat]
+                change = (new - old) / old if old else 0.0
+                mark = ""
+                if change > tolerance:
+                    mark = "  <-- медленнее"
+                    regressions.append((name, metric, stat, old, new))
+                print(f"{name:>10} {metric:>9} {stat:>4}: {old:8.3f} -> {new:8.3f} ms ({change:+.1%}){mark}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    if args.headless:
+        os.environ["ARCADE_HEADLESS"] = "1"
+    if args.software:
+        os.environ["LIBGL_ALWAYS_SOFTWARE"] = "1"
+        os.environ.setdefault("GALLIUM_DRIVER", "llvmpipe")
+
+    # arcade читает переменные окружения при импорте
+    import arcade
+    from pyglet import gl
+    from game import Platformer
+    from replay import Replay
+
+    # Сценарий идет с первого кадра уровня, включая прогрев
+    frames = args.frames + args.warmup
+    if args.replay:
+        replay = Replay.load(args.replay)
+        events, seed = replay.events, replay.seed
+    else:
+        events, seed = script_events(arcade.key, frames), SEED
+
+    game = Platformer(effects_quality=args.quality)
+    if args.check_static:
+        failed = []
+        for index, path in enumerate(game.level_paths):
+            name = os.path.splitext(os.path.basename(path))[0]
+            difference = check_static(game, index)
+            print(f"{name}: кэш статичных слоев отличается от прямой отрисовки на {difference}")
+            if difference > STATIC_TOLERANCE:
+                failed.append(name)
+        game.close()
+        if failed:
+            print(f"Расхождение больше {STATIC_TOLERANCE}: {', '.join(failed)}")
+            sys.exit(1)
+        return
+
+    counter = DrawCallCounter(gl)
+
+    results = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "renderer": game.ctx.info.RENDERER,
+        "frames": args.frames,
+        "warmup": args.warmup,
+        "effects_quality": args.quality,
+        "levels": {},
+    }
+    for index, path in enumerate(game.level_paths):
+        name = os.path.splitext(os.path.basename(path))[0]
+        level = run_level(game, index, events, seed, frames, args.warmup, counter)
+        results["levels"][name] = level
+        print(f"{name}: update {level['update_ms']['mean']:.3f} ms "
+              f"(p99 {level['update_ms']['p99']:.3f}), "
+              f"draw {level['draw_ms']['mean']:.3f} ms (p99 {level['draw_ms']['p99']:.3f}), "
+              f"{level['draw_calls']:.0f} draw calls, {level['max_sprites']} sprites")
+    game.close()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Замедление больше {args.tolerance:.0%}: {len(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
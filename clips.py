@@ -0,0 +1,75 @@
+"""Общие анимационные клипы.
+
+Клип - последовательность кадров и ее зеркальная копия. Зеркальные кадры
+получаются через flip_left_right: у них те же данные картинки, что и у
+исходных, меняются только текстурные координаты, поэтому в атлас картинка
+попадает один раз. Клип загружается по имени один раз и отдается всем, кто
+его просит.
+
+Кадры описываются одним из способов:
+    {"frames": [путь, ...]} - отдельные файлы;
+    {"sheet": путь, "frame_size": (w, h), "columns": n, "count": n} - сетка на листе;
+    {"sheet": путь, "regions": [(x, y, w, h), ...]} - произвольные области листа (атлас).
+Координаты областей отсчитываются от левого верхнего угла листа, как в PIL.
+"length" дополняет клип последним кадром до нужной длины.
+"""
+import arcade
+
+from assets_pack import exists, open_image
+from textures import textures
+
+
+class AnimationClip:
+    def __init__(self, frames):
+        self.frames = frames
+        self.mirrored = [frame.flip_left_right() for frame in frames]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, index, facing_right=True):
+        frames = self.frames if facing_right else self.mirrored
+        if not frames:
+            return None
+        return frames[min(index, len(frames) - 1)]
+
+
+class ClipRegistry:
+    def __init__(self):
+        self.clips = {}
+        self.sheets = {}
+
+    def get_sheet(self, path):
+        sheet = self.sheets.get(path)
+        if sheet is None:
+            sheet = arcade.SpriteSheet(image=open_image(path).convert("RGBA"))
+            self.sheets[path] = sheet
+        return sheet
+
+    def load_frames(self, spec):
+        if "sheet" in spec:
+            if not exists(spec["sheet"]):
+                return []
+            sheet = self.get_sheet(spec["sheet"])
+            if "regions" in spec:
+                return [sheet.get_texture(arcade.LBWH(*region)) for region in spec["regions"]]
+            return sheet.get_texture_grid(spec["frame_size"], spec["columns"], spec["count"])
+        return [textures.get(path) for path in spec.get("frames", []) if exists(path)]
+
+    def get(self, name, spec):
+        clip = self.clips.get(name)
+        if clip is None:
+            frames = self.load_frames(spec)
+            length = spec.get("length", 0)
+            while frames and len(frames) < length:
+                frames.append(frames[-1])
+            clip = AnimationClip(frames)
+            self.clips[name] = clip
+        return clip
+
+    def clear(self):
+        self.clips.clear()
+        self.sheets.clear()
+
+
+clips = ClipRegistry()
@@ -0,0 +1,97 @@
+import math
+from functools import lru_cache
+
+from assets_pack import open_image
+
+MERGE_EPSILON = 0.5
+
+
+def _same(a, b):
+    return abs(a - b) <= MERGE_EPSILON
+
+
+def merge_rects(rects):
+    """Склеивает соседние прямоугольники (left, bottom, right, top) в полосы.
+
+    Сначала объединяются тайлы одного ряда, которые касаются или перекрываются
+    по горизонтали, затем полосы одинаковой ширины, лежащие друг на друге.
+    """
+    rows = {}
+    for left, bottom, right, top in rects:
+        key = (round(bottom / MERGE_EPSILON), round(top / MERGE_EPSILON))
+        rows.setdefault(key, []).append([left, bottom, right, top])
+
+    strips = []
+    for row in rows.values():
+        row.sort()
+        current = row[0]
+        for rect in row[1:]:
+            if rect[0] <= current[2] + MERGE_EPSILON:
+                current[2] = max(current[2], rect[2])
+            else:
+                strips.append(current)
+                current = rect
+        strips.append(current)
+
+    columns = {}
+    for strip in strips:
+        key = (round(strip[0] / MERGE_EPSILON), round(strip[2] / MERGE_EPSILON))
+        columns.setdefault(key, []).append(strip)
+
+    merged = []
+    for column in columns.values():
+        column.sort(key=lambda rect: rect[1])
+        current = column[0]
+        for rect in column[1:]:
+            if rect[1] <= current[3] + MERGE_EPSILON and _same(rect[0], current[0]) and _same(rect[2], current[2]):
+                current[3] = max(current[3], rect[3])
+            else:
+                merged.append(current)
+                current = rect
+        merged.append(current)
+
+    return [tuple(rect) for rect in merged]
+
+
+@lru_cache(maxsize=None)
+def image_bounds(path):
+    """Границы непрозрачной части картинки относительно ее центра: (left, bottom, right, top).
+
+    Совпадает с простым хитбоксом arcade, но не требует окна и OpenGL.
+    """
+    with open_image(path) as image:
+        image = image.convert("RGBA")
+        width, height = image.size
+        bbox = image.getchannel("A").getbbox() or (0, 0, width, height)
+    left, upper, right, lower = bbox
+    return (
+        left - width / 2,
+        height / 2 - lower,
+        right - width / 2,
+        height / 2 - upper,
+    )
+
+
+@lru_cache(maxsize=None)
+def image_size(path):
+    with open_image(path) as image:
+        return image.size
+
+
+def placed_rect(path, scale, x, y):
+    left, bottom, right, top = image_bounds(path)
+    return (x + left * scale, y + bottom * scale, x + right * scale, y + top * scale)
+
+
+def overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def grid_cells(rect, cell_size):
+    x0 = math.floor(rect[0] / cell_size)
+    x1 = math.floor(rect[2] / cell_size)
+    y0 = math.floor(rect[1] / cell_size)
+    y1 = math.floor(rect[3] / cell_size)
+    for cx in range(x0, x1 + 1):
+        for cy in range(y0, y1 + 1):
+            yield cx, cy
@@ -2,6 +2,9 @@
 import json
 import os
 
+# Громкость шин микшера относительно общей громкости эффектов
+DEFAULT_AUDIO_BUSES = {"steps": 0.2, "jump": 0.4, "pickup": 1.0}
+
 
 class config:
     def __init__(self):
@@ -11,6 +14,10 @@ class config:
         self.music_volume = 0.3
         self.sound_effects_volume = 0.5
         self.dark_theme = False
+        self.level_memory_budget_mb = 64
+        # low, medium, high или auto - подстраиваться под время кадра
+        self.effects_quality = "auto"
+        self.audio_buses = dict(DEFAULT_AUDIO_BUSES)
         self.load()
 
     def load(self):
@@ -23,6 +30,9 @@ class config:
                     self.music_volume = data.get('music_volume', 0.3)
                     self.sound_effects_volume = data.get('sound_effects_volume', 0.5)
                     self.dark_theme = data.get('dark_theme', False)
+                    self.level_memory_budget_mb = data.get('level_memory_budget_mb', 64)
+                    self.effects_quality = data.get('effects_quality', "auto")
+                    self.audio_buses = dict(DEFAULT_AUDIO_BUSES, **data.get('audio_buses', {}))
             except:
                 self.save()
 
@@ -32,7 +42,10 @@ class config:
             'sound_effects_enabled': self.sound_effects_enabled,
             'music_volume': self.music_volume,
             'sound_effects_volume': self.sound_effects_volume,
-            'dark_theme': self.dark_theme
+            'dark_theme': self.dark_theme,
+            'level_memory_budget_mb': self.level_memory_budget_mb,
+            'effects_quality': self.effects_quality,
+            'audio_buses': self.audio_buses
         }
         with open(self.config_file, 'w') as f:
             json.dump(data, f, indent=2)
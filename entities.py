@@ -0,0 +1,234 @@
+"""Сущности уровня в массивах NumPy: враги, падающие блоки и движущиеся платформы.
+
+Каждая компонента (позиция, скорость, хитбокс, путь патруля, состояние,
+кадр анимации) - отдельный массив, строка массива - одна сущность. Системы
+обновляют все сущности сразу векторными операциями, поэтому сотня врагов
+стоит почти столько же, сколько один.
+
+Враги и платформы ходят туда и обратно между start и start + path со
+скоростью speed пикселей за тик. Блок висит на месте, пока игрок не окажется
+под ним, затем падает с ускорением до start + path и остается там. Враги и
+падающие блоки опасны. На платформах можно стоять; упавший блок становится
+такой же неподвижной платформой, так что из блоков можно строить ступени.
+Платформы проходимы сбоку и снизу, в статическую геометрию PhysicsGrid
+сущности не попадают.
+"""
+import numpy as np
+
+from collision import image_bounds
+from level_format import ENTITY_KINDS
+
+ENEMY, BLOCK, PLATFORM = (ENTITY_KINDS.index(kind) for kind in ("enemy", "block", "platform"))
+IDLE, MOVING, LANDED = range(3)
+
+BLOCK_GRAVITY = 1.0
+MAX_FALL_SPEED = 24.0
+FRAME_DELAY = 0.15
+LAND_EPSILON = 0.5
+
+
+def overlap_mask(rects, rect):
+    left, bottom, right, top = rect
+    return (rects[:, 0] < right) & (left < rects[:, 2]) & (rects[:, 1] < top) & (bottom < rects[:, 3])
+
+
+class EntityStore:
+    def __init__(self, count=0):
+        self.count = count
+        self.kind = np.zeros(count, np.int8)
+        self.clip = np.zeros(count, np.int16)
+        self.scale = np.ones(count)
+        self.start = np.zeros((count, 2))
+        self.path = np.zeros((count, 2))
+        self.length = np.zeros(count)
+        self.speed = np.zeros(count)
+        self.progress = np.zeros(count)
+        self.direction = np.ones(count)
+        self.position = np.zeros((count, 2))
+        self.previous = np.zeros((count, 2))
+        self.velocity = np.zeros((count, 2))
+        # Хитбокс относительно центра: (left, bottom, right, top) с учетом масштаба
+        self.bounds = np.zeros((count, 4))
+        self.state = np.zeros(count, np.int8)
+        self.frame = np.zeros(count, np.int16)
+        self.frame_timer = np.zeros(count)
+        self.frame_count = np.ones(count, np.int16)
+        # Кадры анимаций: clip - индекс в этом списке
+        self.clips = []
+        self.build_index()
+
+    @classmethod
+    def from_groups(cls, groups):
+        rows = []
+        clips = []
+        for kind, frames, scale, path, speed, coords in groups:
+            clip = len(clips)
+            clips.append(list(frames))
+            bounds = [value * scale for value in image_bounds(frames[0])]
+            for i in range(0, len(coords), 2):
+                rows.append((ENTITY_KINDS.index(kind), clip, scale, coords[i], coords[i + 1],
+                             path[0], path[1], speed, bounds))
+
+        store = cls(len(rows))
+        store.clips = clips
+        if not rows:
+            return store
+        kind, clip, scale, x, y, dx, dy, speed, bounds = zip(*rows)
+        store.kind[:] = kind
+        store.clip[:] = clip
+        store.scale[:] = scale
+        store.start[:, 0] = x
+        store.start[:, 1] = y
+        store.path[:, 0] = dx
+        store.path[:, 1] = dy
+        store.length[:] = np.hypot(store.path[:, 0], store.path[:, 1])
+        store.speed[:] = speed
+        store.bounds[:] = bounds
+        store.frame_count[:] = [len(clips[index]) for index in clip]
+        store.build_index()
+        store.reset()
+        return store
+
+    def __len__(self):
+        return self.count
+
+    def reset(self):
+        self.position[:] = self.start
+        self.previous[:] = self.start
+        self.velocity[:] = 0
+        self.progress[:] = 0
+        self.direction[:] = 1
+        self.state[:] = IDLE
+        self.frame[:] = 0
+        self.frame_timer[:] = 0
+
+    def build_index(self):
+        # Индексы для систем: состав сущностей уровня не меняется
+        patrols = (self.kind != BLOCK) & (self.length > 0) & (self.speed > 0)
+        self.patrol_index = np.flatnonzero(patrols)
+        self.block_index = np.flatnonzero(self.kind == BLOCK)
+        # Кандидаты в опоры: платформы и блоки, опорой блок становится после падения
+        self.surface_index = np.flatnonzero(self.kind != ENEMY)
+        self.hazard_index = np.flatnonzero(self.kind != PLATFORM)
+        self.animated_index = np.flatnonzero(self.frame_count > 1)
+
+    def rects(self, index=slice(None)):
+        position = self.position[index]
+        bounds = self.bounds[index]
+        return np.column_stack((
+            position[:, 0] + bounds[:, 0], position[:, 1] + bounds[:, 1],
+            position[:, 0] + bounds[:, 2], position[:, 1] + bounds[:, 3],
+        ))
+
+    def update(self, dt, player_rect):
+        if not self.count:
+            return
+        self.previous[:] = self.position
+        self.patrol()
+        self.fall(player_rect)
+        self.animate(dt)
+
+    def patrol(self):
+        index = self.patrol_index
+        if not index.size:
+            return
+        length = self.length[index]
+        progress = self.progress[index] + self.direction[index] * self.speed[index]
+        direction = self.direction[index]
+        direction[progress >= length] = -1
+        direction[progress <= 0] = 1
+        progress = np.clip(progress, 0, length)
+        self.direction[index] = direction
+        self.progress[index] = progress
+
+        target = self.start[index] + self.path[index] * (progress / length)[:, None]
+        self.velocity[index] = target - self.position[index]
+        self.position[index] = target
+
+    def fall(self, player_rect):
+        index = self.block_index
+        if not index.size:
+            return
+        left, bottom, right, top = player_rect
+        rects = self.rects(index)
+        below = (rects[:, 0] < right) & (left < rects[:, 2]) & (top <= rects[:, 1])
+        self.state[index[(self.state[index] == IDLE) & below]] = MOVING
+
+        falling = index[self.state[index] == MOVING]
+        if not falling.size:
+            return
+        speed = np.maximum(self.velocity[falling, 1] - BLOCK_GRAVITY, -MAX_FALL_SPEED)
+        y = self.position[falling, 1] + speed
+        floor = self.start[falling, 1] + self.path[falling, 1]
+        landed = y <= floor
+        y[landed] = floor[landed]
+        speed[landed] = 0
+        self.velocity[falling, 1] = speed
+        self.position[falling, 1] = y
+        self.state[falling[landed]] = LANDED
+
+    def animate(self, dt):
+        index = self.animated_index
+        if not index.size:
+            return
+        timer = self.frame_timer[index] + dt
+        advance = timer >= FRAME_DELAY
+        timer[advance] -= FRAME_DELAY
+        frame = self.frame[index]
+        frame[advance] = (frame[advance] + 1) % self.frame_count[index][advance]
+        self.frame_timer[index] = timer
+        self.frame[index] = frame
+
+    def surfaces(self):
+        """Индексы сущностей, на которых сейчас можно стоять"""
+        index = self.surface_index
+        return index[(self.kind[index] == PLATFORM) | (self.state[index] == LANDED)]
+
+    def hazard_hit(self, rect):
+        """Касается ли rect врага или падающего блока"""
+        index = self.hazard_index
+        if not index.size:
+            return False
+        dangerous = (self.kind[index] == ENEMY) | (self.state[index] == MOVING)
+        return bool(np.any(dangerous & overlap_mask(self.rects(index), rect)))
+
+    def support(self, rect, distance):
+        """Индекс опоры, на которой стоял rect до ее сдвига в этом тике, или -1"""
+        index = self.surfaces()
+        if not index.size:
+            return -1
+        left, bottom, right, top = rect
+        rects = self.rects(index)
+        previous_top = self.previous[index, 1] + self.bounds[index, 3]
+        under = ((rects[:, 0] < right) & (left < rects[:, 2])
+                 & (previous_top <= bottom + LAND_EPSILON) & (previous_top >= bottom - distance))
+        if not under.any():
+            return -1
+        candidates = np.flatnonzero(under)
+        return int(index[candidates[np.argmax(previous_top[candidates])]])
+
+    def carry(self, body, platform):
+        """Ставит тело на платформу и сдвигает вместе с ней"""
+        body.x += float(self.velocity[platform, 0])
+        top = float(self.position[platform, 1] + self.bounds[platform, 3])
+        body.y += top - body.rect()[1]
+        if body.change_y < 0:
+            body.change_y = 0.0
+
+    def land(self, body, bottom_before):
+        """Останавливает падающее тело на верхней грани опоры, которую оно пересекло за тик"""
+        index = self.surfaces()
+        if not index.size or body.change_y > 0:
+            return False
+        left, bottom, right, top = body.rect()
+        rects = self.rects(index)
+        crossed = ((rects[:, 0] < right) & (left < rects[:, 2])
+                   & (rects[:, 3] <= bottom_before + LAND_EPSILON) & (rects[:, 3] >= bottom))
+        if not crossed.any():
+            return False
+        body.y += float(rects[crossed, 3].max()) - bottom
+        body.change_y = 0.0
+        return True
+
+    def interpolated(self, alpha):
+        return self.previous + (self.position - self.previous) * alpha
@@ -0,0 +1,115 @@
+import numpy as np
+from arcade.gl import BufferDescription
+
+from textures import textures
+
+WHITE = (255, 255, 255, 255)
+
+
+class EntityRenderer:
+    """Рисует сущности EntityStore одним вызовом прямо из массивов хранилища.
+
+    Использует шейдер списков спрайтов arcade: на каждую сущность одна точка с
+    позицией, размером и номером текстуры в атласе, из которой геометрический
+    шейдер строит квадрат. Номера и размеры кадров считаются таблицей по
+    (clip, frame) при смене уровня, поэтому на кадр остаются только векторные
+    выборки и три записи в буферы.
+    """
+
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.ctx = atlas.ctx
+        self.program = self.ctx.sprite_list_program_cull
+        self.capacity = 0
+        self.count = 0
+        self.buffers = ()
+        self.geometry = None
+        self.frames = []
+        self.frame_sizes = np.zeros((0, 0, 2), np.float32)
+        self.frame_ids = np.zeros((0, 0), np.float32)
+        self.atlas_version = None
+        self.positions = np.zeros((0, 4), np.float32)
+
+    def allocate(self, capacity):
+        ctx = self.ctx
+        self.capacity = capacity
+        self.buffers = (
+            ctx.buffer(reserve=capacity * 4 * 4),
+            ctx.buffer(reserve=capacity * 2 * 4),
+            ctx.buffer(reserve=capacity * 4),
+            ctx.buffer(data=np.tile(np.array(WHITE, np.uint8), capacity)),
+        )
+        position, size, texture, color = self.buffers
+        self.geometry = ctx.geometry(
+            [
+                BufferDescription(position, "4f", ["in_pos"]),
+                BufferDescription(size, "2f", ["in_size"]),
+                BufferDescription(texture, "1f", ["in_texture"]),
+                BufferDescription(color, "4f1", ["in_color"]),
+            ],
+            mode=ctx.POINTS
+        )
+
+    def set_clips(self, clips):
+        """Таблицы кадров уровня: clips - списки путей из EntityStore.clips"""
+        self.frames = [[textures.get(path) for path in clip] for clip in clips]
+        longest = max((len(clip) for clip in clips), default=0)
+        self.frame_sizes = np.zeros((len(clips), longest, 2), np.float32)
+        for clip, (paths, frames) in enumerate(zip(clips, self.frames)):
+            for frame, (path, texture) in enumerate(zip(paths, frames)):
+                # Запеченная текстура уменьшена, на экране нужен размер оригинала
+                bake_x, bake_y = textures.bake_scale(path)
+                self.frame_sizes[clip, frame] = (texture.width / bake_x, texture.height / bake_y)
+        self.frame_ids = np.zeros((len(clips), longest), np.float32)
+        self.atlas_version = None
+
+    def clear(self):
+        self.set_clips([])
+        self.count = 0
+
+    def update_ids(self):
+        # Номера текстур меняются только при перестройке атласа
+        if self.atlas_version == self.atlas.version:
+            return
+        atlas = self.atlas
+        for clip, frames in enumerate(self.frames):
+            for frame, texture in enumerate(frames):
+                if not atlas.has_texture(texture):
+                    atlas.add(texture)
+                self.frame_ids[clip, frame] = atlas.get_texture_id(texture)
+        self.atlas_version = atlas.version
+
+    def write(self, store, alpha):
+        """Переносит в буферы позиции, размеры и кадры всех сущностей"""
+        count = self.count = store.count
+        if not count or not self.frames:
+            return
+        if count > self.capacity:
+            self.allocate(count)
+            self.positions = np.zeros((count, 4), np.float32)
+        self.update_ids()
+
+        positions = self.positions[:count]
+        positions[:, :2] = store.interpolated(alpha)
+        sizes = self.frame_sizes[store.clip, store.frame] * store.scale[:, None]
+        ids = self.frame_ids[store.clip, store.frame]
+        position, size, texture, color = self.buffers
+        position.write(positions)
+        size.write(sizes.astype(np.float32))
+        texture.write(ids)
+
+    def draw(self):
+        if not self.count or not self.frames:
+            return
+        ctx = self.ctx
+        atlas = self.atlas
+        program = self.program
+        program["spritelist_color"] = (1.0, 1.0, 1.0, 1.0)
+        program.set_uniform_safe("uv_offset_bias", 0.0 if ctx.NEAREST in atlas.texture.filter else 1.0)
+        atlas.texture.use(0)
+        atlas.use_uv_texture(1)
+        blend_func = ctx.blend_func
+        ctx.blend_func = ctx.BLEND_DEFAULT
+        with ctx.enabled(ctx.BLEND):
+            self.geometry.render(program, vertices=self.count)
+        ctx.blend_func = blend_func
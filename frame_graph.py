@@ -0,0 +1,132 @@
+from array import array
+
+import arcade
+from arcade.gl import BufferDescription
+
+from profiler import GRAPH_FRAMES
+
+VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_vert;
+in vec4 in_color;
+out vec4 v_color;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_vert, 0.0, 1.0);
+    v_color = in_color;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+in vec4 v_color;
+out vec4 f_color;
+
+void main() {
+    f_color = v_color;
+}
+"""
+
+PHASE_COLORS = {
+    "input": (0.6, 0.6, 0.6),
+    "entities": (0.9, 0.3, 0.2),
+    "movement": (0.3, 0.6, 1.0),
+    "physics": (0.1, 0.4, 0.9),
+    "triggers": (0.9, 0.8, 0.2),
+    "camera": (0.7, 0.4, 0.9),
+    "animation": (0.3, 0.8, 0.8),
+    "events": (1.0, 0.5, 0.1),
+    "effects": (1.0, 0.3, 0.5),
+    "background": (0.2, 0.7, 0.3),
+    "static": (0.4, 0.9, 0.4),
+    "sprites": (0.8, 0.9, 0.3),
+    "particles": (1.0, 0.6, 0.7),
+    "foreground": (0.5, 0.5, 0.2),
+    "gui": (0.9, 0.9, 0.9),
+}
+OTHER_COLOR = (0.4, 0.4, 0.4)
+
+MAX_PHASES = 16
+VERTEX_SIZE = 6 * 4
+
+
+class FrameGraph:
+    """Столбчатый график времени кадра: каждый кадр - столбик из фаз"""
+
+    def __init__(self, ctx, left, bottom, width, height, max_ms=1000 / 30):
+        self.ctx = ctx
+        self.left = left
+        self.bottom = bottom
+        self.width = width
+        self.height = height
+        self.max_ms = max_ms
+        self.program = ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+        self.buffer = ctx.buffer(reserve=GRAPH_FRAMES * MAX_PHASES * 6 * VERTEX_SIZE)
+        self.geometry = ctx.geometry(
+            [BufferDescription(self.buffer, "2f 4f", ["in_vert", "in_color"])],
+            mode=ctx.TRIANGLES
+        )
+
+    def build(self, frames):
+        data = array("f")
+        bar_width = self.width / GRAPH_FRAMES
+        scale = self.height / self.max_ms
+        top_limit = self.bottom + self.height
+        x = self.left + self.width - len(frames) * bar_width
+        for phases in frames:
+            y = self.bottom
+            for name, ms in list(phases.items())[:MAX_PHASES]:
+                if y >= top_limit:
+                    break
+                top = min(y + ms * scale, top_limit)
+                r, g, b = PHASE_COLORS.get(name, OTHER_COLOR)
+                right = x + bar_width
+                for vx, vy in ((x, y), (right, y), (right, top), (x, y), (right, top), (x, top)):
+                    data.extend((vx, vy, r, g, b, 0.9))
+                y = top
+            x += bar_width
+        return data
+
+    def draw(self, profiler):
+        arcade.draw_lrbt_rectangle_filled(
+            self.left, self.left + self.width, self.bottom, self.bottom + self.height, (0, 0, 0, 160)
+        )
+        data = self.build(profiler.frames)
+        if data:
+            self.buffer.write(data)
+            # Полосы полупрозрачные; arcade выключает смешивание после каждой отрисовки фигур
+            ctx = self.ctx
+            previous_blend = ctx.blend_func
+            ctx.blend_func = ctx.BLEND_DEFAULT
+            try:
+                with ctx.enabled(ctx.BLEND):
+                    self.geometry.render(self.program, vertices=len(data) // 6)
+            finally:
+                ctx.blend_func = previous_blend
+
+        # Линии бюджета 60 и 30 кадров в секунду
+        for ms, color in ((1000 / 60, arcade.color.GREEN), (1000 / 30, arcade.color.RED)):
+            y = self.bottom + min(ms / self.max_ms, 1.0) * self.height
+            arcade.draw_line(self.left, y, self.left + self.width, y, color, 1)
+
+        last = profiler.frames[-1] if profiler.frames else {}
+        total = sum(last.values())
+        arcade.draw_text(
+            f"{total:.2f} мс", self.left + 4, self.bottom + self.height + 4,
+            arcade.color.WHITE, 12, font_name="Arial"
+        )
+        y = self.bottom + self.height - 14
+        for name, ms in last.items():
+            r, g, b = PHASE_COLORS.get(name, OTHER_COLOR)
+            arcade.draw_text(
+                f"{name} {ms:.2f}", self.left + self.width + 8, y,
+                (int(r * 255), int(g * 255), int(b * 255)), 11, font_name="Arial"
+            )
+            y -= 14
@@ -3,278 +3,176 @@ from arcade.camera import Camera2D
 from effects import EffectsManager
 from player import PlayerAnimation
 from config import config
-import os
+from textures import textures
+from background import Background
+from static_cache import StaticLayerCache
+from level_format import LAYERS, list_levels, load_level
+from replay import Replay, PRESS, RELEASE
+from profiler import Profiler, NULL_PROFILER
+from frame_graph import FrameGraph
+from world_atlas import create_world_atlas
+from entity_renderer import EntityRenderer
+from quality import pinned
+import assets_pack
+import warm_start
+from simulation import (LevelGeometry, SimInputs, create_state, step,
+                        WORLD_LEFT, WORLD_RIGHT, WORLD_BOTTOM, WORLD_TOP,
+                        PLAYER_IMAGE, TICK_DT)
+import argparse
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
 SCREEN_W = 1280
 SCREEN_H = 720
 TITLE = "Escape the Castle"
 
-GRAVITY = 4
-MOVE_SPEED = 6
-JUMP_SPEED = 20
-LADDER_SPEED = 3
-
-COYOTE_TIME = 0.08
-JUMP_BUFFER = 0.12
-MAX_JUMPS = 1
+# Частота отрисовки не влияет на физику: симуляция всегда идет тиками по TICK_DT
+RENDER_RATE = 240
+MAX_FRAME_TIME = 0.25
 
-CAMERA_LERP = 0.12
 WORLD_COLOR = arcade.color.SKY_BLUE
 
-WORLD_WIDTH = 2000
-WORLD_HEIGHT = 900
-WORLD_LEFT = 0
-WORLD_RIGHT = WORLD_WIDTH
-WORLD_BOTTOM = 0
-WORLD_TOP = WORLD_HEIGHT
+SPRITE_BYTES = 512
+
+
+def sprite_scale(path, scale):
+    """Масштаб спрайта с учетом того, что запеченная текстура уже уменьшена"""
+    bake_x, bake_y = textures.bake_scale(path)
+    return scale / bake_x, scale / bake_y
+
+
+def sprite_texture_paths(data):
+    """Пути всех текстур спрайтов уровня: тайлы, предметы и кадры сущностей"""
+    paths = []
+    for layer in LAYERS:
+        for texture, scale, coords in data.groups(layer):
+            paths.append(texture)
+    for kind, frames, scale, path, speed, coords in data.entities:
+        paths += frames
+    return paths
 
 
 class Level:
-    def __init__(self):
-        self.background_sprites = arcade.SpriteList()
-        self.foreground_sprites = arcade.SpriteList()
-        self.walls = arcade.SpriteList(use_spatial_hash=True)
-        self.ladders = arcade.SpriteList()
-        self.keys = arcade.SpriteList()
-        self.doors = arcade.SpriteList()
-        self.hazards = arcade.SpriteList()
+    def __init__(self, path, world_atlas=None):
+        self.path = path
+        self.world_atlas = world_atlas
+        atlas = world_atlas.atlas if world_atlas else None
+        self.background = Background((WORLD_LEFT, WORLD_RIGHT, WORLD_BOTTOM, WORLD_TOP))
+        self.foreground_sprites = arcade.SpriteList(atlas=atlas)
+        self.walls = arcade.SpriteList(atlas=atlas)
+        self.ladders = arcade.SpriteList(atlas=atlas)
+        self.keys = arcade.SpriteList(atlas=atlas)
+        self.doors = arcade.SpriteList(atlas=atlas)
+        self.hazards = arcade.SpriteList(atlas=atlas)
+        self.static_layers = StaticLayerCache(
+            (WORLD_LEFT, WORLD_RIGHT, WORLD_BOTTOM, WORLD_TOP), (SCREEN_W, SCREEN_H)
+        )
         self.spawn_point = (0, 0)
         self.level_color = arcade.color.SKY_BLUE
-
-    def load_background(self, filename, tile_scale=1.0):
-        self.background_sprites.clear()
-        if not os.path.exists(filename):
+        self.geometry = None
+        self.key_sprites = []
+        self.keys_alive = []
+        self.texture_paths = set()
+        self.last_used = 0
+        # Сущности рисуются из массивов EntityStore, без спрайтов
+        self.entities = EntityRenderer(atlas or arcade.get_window().ctx.default_atlas)
+
+    def load_background(self, filename, tile_scale=1.0, parallax=1.0):
+        if not assets_pack.exists(filename):
             return False
-
-        texture = arcade.load_texture(filename)
-        tile_width = texture.width * tile_scale
-        tile_height = texture.height * tile_scale
-        tiles_x = int(WORLD_WIDTH / tile_width) + 2
-        tiles_y = int(WORLD_HEIGHT / tile_height) + 2
-
-        for y in range(tiles_y):
-            for x in range(tiles_x):
-                pos_x = x * tile_width + tile_width / 2
-                pos_y = y * tile_height + tile_height / 2
-                bg_sprite = arcade.Sprite(texture, scale=tile_scale)
-                bg_sprite.center_x = pos_x
-                bg_sprite.center_y = pos_y
-                self.background_sprites.append(bg_sprite)
+        self.background.add_layer(filename, tile_scale, parallax)
+        self.texture_paths.add(filename)
         return True
 
-    def setup(self):
-        raise NotImplementedError("Subclasses must implement setup method")
-
-    def draw(self):
-        arcade.draw_lrbt_rectangle_filled(
-            0, WORLD_WIDTH, 0, WORLD_HEIGHT, self.level_color
-        )
-        self.background_sprites.draw()
-        self.walls.draw()
-        self.ladders.draw()
+    def setup(self, data=None):
+        if data is None:
+            data = load_level(self.path)
+        self.spawn_point = data.spawn
+        self.level_color = data.color
+        self.background.color = data.color
+        self.background.clear()
+        for filename, tile_scale, parallax in data.background:
+            self.load_background(filename, tile_scale, parallax)
+
+        if self.world_atlas is not None:
+            # Текстуры уровня попадают в атлас одной пачкой, а не по мере добавления спрайтов
+            self.world_atlas.add([textures.get(path) for path in sprite_texture_paths(data)])
+
+        for layer in LAYERS:
+            sprites = self.foreground_sprites if layer == "foreground" else getattr(self, layer)
+            for texture, scale, x, y in data.positions(layer):
+                sprite = arcade.Sprite(textures.get(texture), scale=sprite_scale(texture, scale))
+                sprite.center_x = x
+                sprite.center_y = y
+                sprites.append(sprite)
+                self.texture_paths.add(texture)
+
+        clips = [frames for kind, frames, scale, path, speed, coords in data.entities]
+        self.entities.set_clips(clips)
+        for frames in clips:
+            self.texture_paths.update(frames)
+
+        self.geometry = LevelGeometry.from_data(data)
+        self.key_sprites = list(self.keys)
+        self.keys_alive = [True] * len(self.key_sprites)
+        self.static_layers.set_layers([self.walls, self.ladders])
+
+    def sprite_lists(self):
+        return (self.foreground_sprites, self.walls,
+                self.ladders, self.keys, self.doors, self.hazards)
+
+    def memory_estimate(self):
+        sprite_count = sum(len(sprites) for sprites in self.sprite_lists())
+        return sprite_count * SPRITE_BYTES + textures.size_in_bytes(self.texture_paths)
+
+    def release(self):
+        # После очистки на текстуры уровня не остается ссылок, и атлас освобождает их области
+        for sprites in self.sprite_lists():
+            sprites.clear()
+        self.key_sprites = []
+        self.entities.clear()
+        self.background.clear()
+        self.static_layers.invalidate()
+
+    def draw(self, camera, profiler=NULL_PROFILER):
+        self.background.draw(camera)
+        profiler.lap("background")
+        self.static_layers.draw(camera)
+        profiler.lap("static")
         self.keys.draw()
         self.doors.draw()
         self.hazards.draw()
+        self.entities.draw()
+
+    def sync_entities(self, entities, alpha):
+        """Переносит позиции и кадры всех сущностей в буферы одной векторной записью"""
+        self.entities.write(entities, alpha)
+
+    def collect_key(self, index):
+        self.keys_alive[index] = False
+        self.key_sprites[index].remove_from_sprite_lists()
 
     def draw_foreground(self):
         self.foreground_sprites.draw()
 
 
-class Level1(Level):
-    def setup(self):
-        self.spawn_point = (128, 256)
-        self.level_color = (135, 206, 235)
-        self.load_background('assets/Level_1.png', tile_scale=1.0)
-
-        for x in range(0, 575, 64):
-            wall = arcade.Sprite("images/wall.png", scale=0.1)
-            wall.center_x = x
-            wall.center_y = 400
-            self.walls.append(wall)
-
-        for x in range(0, WORLD_WIDTH, 64):
-            floor_tile = arcade.Sprite("images/wall.png", scale=0.1)
-            floor_tile.center_x = x
-            floor_tile.center_y = 64
-            self.walls.append(floor_tile)
-
-        for y in range(65, 64 + 64 * 4, 64):
-            ladder = arcade.Sprite("images/tiles/ladderMid.png", scale=0.5)
-            ladder.center_x = 600
-            ladder.center_y = y
-            self.ladders.append(ladder)
-
-        key = arcade.Sprite("images/key.png", scale=1)
-        key.center_x = 250
-        key.center_y = 200
-        self.keys.append(key)
-
-        door = arcade.Sprite("images/door.png", scale=0.25)
-        door.center_x = 220
-        door.center_y = 490
-        self.doors.append(door)
-
-
-class Level2(Level):
-    def setup(self):
-        self.spawn_point = (100, 150)
-        self.level_color = (70, 130, 180)
-        self.load_background('assets/Level_2.1.png', tile_scale=0.8)
-
-        for x in range(0, WORLD_WIDTH, 64):
-            floor_tile = arcade.Sprite("images/floor_1.png", scale=0.6)
-            floor_tile.center_x = x
-            floor_tile.center_y = 100
-            self.walls.append(floor_tile)
-
-        platform_config = [(1000, 350, 3), (800, 350, 2), (1300, 700, 3)]
-        for x, y, width in platform_config:
-            for i in range(width):
-                platform = arcade.Sprite("images/floor_2.png", scale=0.6)
-                platform.center_x = x + (i * 64)
-                platform.center_y = y
-                self.walls.append(platform)
-
-        for y in range(200, 270, 64):
-            ladder = arcade.Sprite("images/tiles/ladderMid.png", scale=0.5)
-            ladder.center_x = 700
-            ladder.center_y = y
-            self.ladders.append(ladder)
-
-        for y in range(500, 600, 64):
-            ladder = arcade.Sprite("images/tiles/ladderMid.png", scale=0.5)
-            ladder.center_x = 1150
-            ladder.center_y = y
-            self.ladders.append(ladder)
-
-        key = arcade.Sprite("images/key.png", scale=1)
-        key.center_x = 1400
-        key.center_y = 750
-        self.keys.append(key)
-
-        door = arcade.Sprite("images/door.png", scale=0.25)
-        door.center_x = 1200
-        door.center_y = 70
-        self.doors.append(door)
-
-
-class Level3(Level):
-    def setup(self):
-        self.spawn_point = (150, 300)
-        self.level_color = (95, 158, 160)
-        self.load_background('assets/Level_3.png', tile_scale=2)
-
-        for x in range(0, WORLD_WIDTH, 64):
-            floor_tile = arcade.Sprite("images/floor_3.png", scale=2)
-            floor_tile.center_x = x
-            floor_tile.center_y = 50
-            self.walls.append(floor_tile)
-
-        platforms = [
-            (480, 490, 6, "images/floor_3.png"),
-            (720, 745, 2, "images/floor_3.png"),
-            (1000, 625, 6, "images/floor_3.png"),
-            (1500, 624, 3, "images/floor_3.png")
-        ]
-
-        for x, y, width, sprite_path in platforms:
-            for i in range(width):
-                platform = arcade.Sprite(sprite_path, scale=1.5)
-                platform.center_x = x + (i * 64)
-                platform.center_y = y
-                self.walls.append(platform)
-
-        for y in range(280, 350, 64):
-            ladder = arcade.Sprite("images/tiles/ladderMid.png", scale=0.5)
-            ladder.center_x = 400
-            ladder.center_y = y
-            self.ladders.append(ladder)
-
-        for y in range(640, 645, 1):
-            ladder = arcade.Sprite("images/tiles/ladderMid.png", scale=0.5)
-            ladder.center_x = 850
-            ladder.center_y = y
-            self.ladders.append(ladder)
-
-        key1 = arcade.Sprite("images/key.png", scale=1)
-        key1.center_x = 720
-        key1.center_y = 800
-        self.keys.append(key1)
-
-        key2 = arcade.Sprite("images/key.png", scale=1)
-        key2.center_x = 1920
-        key2.center_y = 150
-        self.keys.append(key2)
-
-        door = arcade.Sprite("images/door.png", scale=0.25)
-        door.center_x = 1825
-        door.center_y = 550
-        self.doors.append(door)
-
-
-class Level4(Level):
-    def setup(self):
-        self.spawn_point = (180, 350)
-        self.level_color = (47, 79, 79)
-        self.load_background('assets/Level_4.png', tile_scale=1.5)
-
-        for x in range(0, WORLD_WIDTH, 64):
-            floor_tile = arcade.Sprite("images/floor_4.png", scale=1)
-            floor_tile.center_x = x
-            floor_tile.center_y = 140
-            self.walls.append(floor_tile)
-
-        for x in range(0, WORLD_WIDTH, 64):
-            floor_tile = arcade.Sprite("images/floor_4.png", scale=1)
-            floor_tile.center_x = x
-            floor_tile.center_y = 110
-            self.walls.append(floor_tile)
-
-        platforms = [
-            (770, 350, 2, "images/floor_4.png"),
-            (1060, 240, 1, "images/floor_4.png"),
-            (600, 350, 1, "images/floor_4.png"),
-            (320, 700, 3, "images/floor_4.png"),
-            (150, 700, 1, "images/floor_4.png"),
-            (600, 580, 1, "images/floor_4.png"),
-            (800, 580, 2, "images/floor_4.png"),
-            (921, 657, 3, "images/floor_4.png"),
-            (1200, 657, 5, "images/floor_4.png"),
-            (1500, 695, 10, "images/floor_4.png")
-        ]
-
-        for x, y, width, sprite_path in platforms:
-            for i in range(width):
-                platform = arcade.Sprite(sprite_path, scale=1)
-                platform.center_x = x + (i * 64)
-                platform.center_y = y
-                self.walls.append(platform)
-
-        ladder_positions = [(900, 350, 400), (540, 400, 700)]
-        for x, y_start, y_end in ladder_positions:
-            for y in range(y_start, y_end, 64):
-                ladder = arcade.Sprite("images/tiles/ladderMid_2.png", scale=0.5)
-                ladder.center_x = x
-                ladder.center_y = y
-                self.ladders.append(ladder)
-
-        key_positions = [(1066, 200), (150, 750), (1980, 200)]
-        for x, y in key_positions:
-            key = arcade.Sprite("images/key.png", scale=1)
-            key.center_x = x
-            key.center_y = y
-            self.keys.append(key)
-
-        door = arcade.Sprite("images/door.png", scale=0.25)
-        door.center_x = 1900
-        door.center_y = 750
-        self.doors.append(door)
+def preload_level(path):
+    """Читает уровень и декодирует его текстуры; вызывается в фоновом потоке"""
+    data = load_level(path)
+    for filename, tile_scale, parallax in data.background:
+        if assets_pack.exists(filename):
+            textures.get(filename)
+    for texture in sprite_texture_paths(data):
+        textures.get(texture)
+    return data
 
 
 class Platformer(arcade.Window):
-    def __init__(self):
-        super().__init__(SCREEN_W, SCREEN_H, TITLE, antialiasing=True)
+    def __init__(self, recording=None, playback=None, visible=True, effects_quality=None,
+                 level_paths=None):
+        super().__init__(SCREEN_W, SCREEN_H, TITLE, antialiasing=True, visible=visible,
+                         update_rate=1 / RENDER_RATE, draw_rate=1 / RENDER_RATE)
 
         self.show_level_message = False
         self.level_message_timer = 0
@@ -288,24 +186,39 @@ class Platformer(arcade.Window):
 
         self.frame_delay = 0.15
         self.player_animation = PlayerAnimation()
+        self.level_paths = list(level_paths) if level_paths else list_levels()
+        self.world_atlas = create_world_atlas(
+            self.ctx, self.player_animation.clips.values(), [textures.get(PLAYER_IMAGE)]
+        )
         self.world_camera = Camera2D()
         self.gui_camera = Camera2D()
-        self.player_list = arcade.SpriteList()
-        self.engine = None
-        self.effects = EffectsManager()
+        self.player_list = arcade.SpriteList(atlas=self.world_atlas.atlas)
+        self.state = None
+        self.recording = recording
+        self.playback = playback
+        replay = playback or recording
+        if replay and effects_quality is None:
+            # Частицы при записи и воспроизведении не должны зависеть от времени кадра
+            effects_quality = pinned(config.effects_quality)
+        # Регулятор эффектов сравнивает время кадра с интервалом отрисовки окна
+        self.effects = EffectsManager(replay.seed if replay else None, start_music=visible,
+                                      quality=effects_quality, frame_budget=1 / RENDER_RATE)
+        self.tick_count = 0
+        self.profiler = Profiler()
+        self.frame_graph = None
         self.left = self.right = self.up = self.down = self.jump_pressed = False
-        self.jump_buffer_timer = 0.0
-        self.time_since_ground = 999.0
-        self.jumps_left = MAX_JUMPS
-        self.was_jumping = False
-        self.is_facing_right = True
-        self.last_direction = 1
-        self.player_animation = PlayerAnimation()
+        self.pressed_actions = set()
+        self.released_actions = set()
+        self.tick_accumulator = 0.0
+        self.previous_player_position = (0, 0)
+        self.previous_camera_position = (SCREEN_W / 2, SCREEN_H / 2)
         self.current_level = None
-        self.levels = []
+        self.current_level_index = 0
+        self.levels = {}
+        self.level_prefetch = {}
+        self.level_loader = ThreadPoolExecutor(max_workers=1)
 
-        self.setup_levels()
-        self.switch_to_level(0)
+        self.switch_to_level(playback.level if playback else 0)
         self.setup()
 
         self.load_end_background()
@@ -314,8 +227,8 @@ class Platformer(arcade.Window):
     def load_end_background(self):
         self.end_background_sprites.clear()
         try:
-            if os.path.exists("assets/end.png"):
-                texture = arcade.load_texture("assets/end.png")
+            if assets_pack.exists("assets/end.png"):
+                texture = textures.get("assets/end.png")
                 sprite = arcade.Sprite(texture, scale=1.0)
 
                 tex_width = texture.width
@@ -354,29 +267,73 @@ class Platformer(arcade.Window):
         panel_sprite.center_y = 120
         self.instruction_panel_sprites.append(panel_sprite)
 
-    def setup_levels(self):
-        self.levels = [Level1(), Level2(), Level3(), Level4()]
-        for level in self.levels:
-            level.setup()
+    def get_level(self, index):
+        level = self.levels.get(index)
+        if level is None:
+            future = self.level_prefetch.pop(index, None)
+            data = None
+            if future is not None:
+                try:
+                    data = future.result()
+                except Exception as e:
+                    # Ошибку фоновой загрузки не пробрасываем: Level.setup загрузит уровень заново
+                    print(f"Фоновая загрузка уровня {self.level_paths[index]} не удалась: {e}")
+            level = Level(self.level_paths[index], self.world_atlas)
+            level.setup(data)
+            self.levels[index] = level
+        level.last_used = time.time()
+        return level
+
+    def prefetch_level(self, index):
+        if not 0 <= index < len(self.level_paths):
+            return
+        if index in self.levels or index in self.level_prefetch:
+            return
+        self.level_prefetch[index] = self.level_loader.submit(preload_level, self.level_paths[index])
+
+    def evict_levels(self):
+        budget = config.level_memory_budget_mb * 1024 * 1024
+        total = sum(level.memory_estimate() for level in self.levels.values())
+        finished = sorted(
+            (index for index in self.levels if index < self.current_level_index),
+            key=lambda index: self.levels[index].last_used
+        )
+        for index in finished:
+            if total <= budget:
+                break
+            level = self.levels.pop(index)
+            total -= level.memory_estimate()
+            level.release()
+            still_used = set()
+            for other in self.levels.values():
+                still_used |= other.texture_paths
+            textures.discard(level.texture_paths - still_used)
 
     def switch_to_level(self, index):
-        if 0 <= index < len(self.levels):
-            self.current_level = self.levels[index]
+        if 0 <= index < len(self.level_paths):
+            if self.current_level is not None and index != self.current_level_index:
+                # Кэш статичных слоев нужен только текущему уровню
+                self.current_level.static_layers.invalidate()
+            self.current_level_index = index
+            self.current_level = self.get_level(index)
             self.setup()
             self.show_level_message = True
             self.level_message_timer = self.level_message_duration
+            self.evict_levels()
+            self.prefetch_level(index + 1)
 
     def setup(self):
         self.player_list.clear()
-        self.player = arcade.Sprite("images/player/walk_1.png", scale=1)
+        self.player = arcade.Sprite(textures.get(PLAYER_IMAGE), scale=1)
         self.player.center_x, self.player.center_y = self.current_level.spawn_point
         self.player_list.append(self.player)
-        self.engine = arcade.PhysicsEnginePlatformer(
-            player_sprite=self.player,
-            gravity_constant=GRAVITY,
-            walls=self.current_level.walls,
-            ladders=self.current_level.ladders
+        self.state = create_state(
+            self.current_level.geometry,
+            (self.world_camera.viewport_width, self.world_camera.viewport_height),
+            camera=self.world_camera.position,
+            keys_alive=self.current_level.keys_alive
         )
+        self.state.profiler = self.profiler
         self.player.change_x = 0
         self.player.change_y = 0
         self.left = False
@@ -384,7 +341,21 @@ class Platformer(arcade.Window):
         self.up = False
         self.down = False
         self.jump_pressed = False
-        self.jump_buffer_timer = 0.0
+        self.pressed_actions.clear()
+        self.released_actions.clear()
+        self.tick_accumulator = 0.0
+        self.previous_player_position = self.current_level.spawn_point
+        self.previous_camera_position = self.state.camera
+
+    def interpolate(self, alpha):
+        body = self.state.body
+        px, py = self.previous_player_position
+        cx, cy = self.previous_camera_position
+        cam_x, cam_y = self.state.camera
+        self.player.center_x = px + (body.x - px) * alpha
+        self.player.center_y = py + (body.y - py) * alpha
+        self.world_camera.position = (cx + (cam_x - cx) * alpha, cy + (cam_y - cy) * alpha)
+        self.current_level.sync_entities(self.state.entities, alpha)
 
     def draw_results_screen(self):
         arcade.set_background_color(arcade.color.BLACK)
@@ -465,15 +436,35 @@ class Platformer(arcade.Window):
             self.draw_results_screen()
             return
 
+        profiler = self.profiler
+        profiler.start("draw")
+        self.interpolate(self.tick_accumulator / TICK_DT)
         self.world_camera.use()
-        self.current_level.draw()
+        self.current_level.draw(self.world_camera, profiler)
         self.player_list.draw()
+        profiler.lap("sprites")
         self.effects.draw()
+        profiler.lap("particles")
         self.current_level.draw_foreground()
+        profiler.lap("foreground")
         self.gui_camera.use()
         self.draw_gui()
         if self.show_level_message:
             self.draw_level_message()
+        profiler.lap("gui")
+        if profiler.enabled:
+            profiler.end_frame()
+            self.draw_profiler()
+
+    def draw_profiler(self):
+        if self.frame_graph is None:
+            self.frame_graph = FrameGraph(self.ctx, 10, SCREEN_H - 190, 480, 120)
+        self.frame_graph.draw(self.profiler)
+
+    def export_profile(self):
+        path = time.strftime("profile_%Y%m%d_%H%M%S.json")
+        self.profiler.export(path)
+        print(f"Профиль сохранен в {path}")
 
     def draw_gui(self):
         if not self.game_completed:
@@ -491,7 +482,7 @@ class Platformer(arcade.Window):
             )
 
     def draw_level_message(self):
-        level_num = self.levels.index(self.current_level) + 1
+        level_num = self.current_level_index + 1
         arcade.draw_text(
             f"Уровень {level_num}",
             SCREEN_W // 2, SCREEN_H // 2 + 10,
@@ -511,6 +502,42 @@ class Platformer(arcade.Window):
         )
 
     def on_key_press(self, key, modifiers):
+        # Клавиши профилировщика не попадают в запись ввода
+        if key == arcade.key.F3:
+            self.profiler.toggle()
+            return
+        if key == arcade.key.F4:
+            if self.profiler.enabled:
+                self.export_profile()
+            return
+        if self.playback is not None:
+            # Во время воспроизведения живой ввод игнорируется, кроме выхода
+            if key == arcade.key.ESCAPE:
+                arcade.exit()
+            return
+        if self.recording is not None:
+            self.recording.record(self.tick_count, PRESS, key)
+        self.handle_key_press(key)
+
+    def on_key_release(self, key, modifiers):
+        if self.playback is not None:
+            return
+        if self.recording is not None:
+            self.recording.record(self.tick_count, RELEASE, key)
+        self.handle_key_release(key)
+
+    def feed_replay(self):
+        if self.playback is None:
+            return
+        for tick, kind, key in self.playback.due(self.tick_count):
+            if kind == PRESS:
+                self.handle_key_press(key)
+            else:
+                self.handle_key_release(key)
+        if self.playback.finished():
+            self.playback = None
+
+    def handle_key_press(self, key):
         if self.game_completed:
             if key == arcade.key.ESCAPE:
                 arcade.exit()
@@ -522,52 +549,47 @@ class Platformer(arcade.Window):
 
         if key in (arcade.key.LEFT, arcade.key.A):
             self.left = True
-            self.is_facing_right = False
-            self.last_direction = -1
+            self.pressed_actions.add("left")
         elif key in (arcade.key.RIGHT, arcade.key.D):
             self.right = True
-            self.is_facing_right = True
-            self.last_direction = 1
+            self.pressed_actions.add("right")
         elif key in (arcade.key.UP, arcade.key.W):
             self.up = True
         elif key in (arcade.key.DOWN, arcade.key.S):
             self.down = True
         elif key == arcade.key.SPACE:
             self.jump_pressed = True
-            self.jump_buffer_timer = JUMP_BUFFER
+            self.pressed_actions.add("jump")
         elif key == arcade.key.R:
-            self.switch_to_level(self.levels.index(self.current_level))
+            self.switch_to_level(self.current_level_index)
         elif key == arcade.key.N:
-            next_level = (self.levels.index(self.current_level) + 1) % len(self.levels)
+            next_level = (self.current_level_index + 1) % len(self.level_paths)
             self.switch_to_level(next_level)
         elif key == arcade.key.P:
-            prev_level = (self.levels.index(self.current_level) - 1) % len(self.levels)
+            prev_level = (self.current_level_index - 1) % len(self.level_paths)
             self.switch_to_level(prev_level)
         elif key == arcade.key.ESCAPE:
             arcade.exit()
 
-    def on_key_release(self, key, modifiers):
+    def handle_key_release(self, key):
         if self.game_completed:
             return
 
         if key in (arcade.key.LEFT, arcade.key.A):
             self.left = False
-            if not self.right:
-                self.is_facing_right = (self.last_direction == 1)
         elif key in (arcade.key.RIGHT, arcade.key.D):
             self.right = False
-            if not self.left:
-                self.is_facing_right = (self.last_direction == 1)
         elif key in (arcade.key.UP, arcade.key.W):
             self.up = False
         elif key in (arcade.key.DOWN, arcade.key.S):
             self.down = False
         elif key == arcade.key.SPACE:
             self.jump_pressed = False
-            if self.player.change_y > 0:
-                self.player.change_y *= 0.45
+            self.released_actions.add("jump")
 
     def on_update(self, delta_time):
+        self.feed_replay()
+        self.effects.record_frame(delta_time)
         if self.game_completed:
             return
 
@@ -576,155 +598,121 @@ class Platformer(arcade.Window):
             if self.level_message_timer <= 0:
                 self.show_level_message = False
 
-        move = 0
-        is_moving_horizontally = False
-        is_moving_on_ladder = False
-
-        if self.left and not self.right:
-            move = -MOVE_SPEED
-            is_moving_horizontally = True
-            self.is_facing_right = False
-            self.last_direction = -1
-        elif self.right and not self.left:
-            move = MOVE_SPEED
-            is_moving_horizontally = True
-            self.is_facing_right = True
-            self.last_direction = 1
-        elif not is_moving_horizontally:
-            self.is_facing_right = (self.last_direction == 1)
-
-        player_width = self.player.width
-        next_x = self.player.center_x + move
-
-        if next_x - player_width / 2 < WORLD_LEFT:
-            move = 0
-            self.player.center_x = WORLD_LEFT + player_width / 2
-        elif next_x + player_width / 2 > WORLD_RIGHT:
-            move = 0
-            self.player.center_x = WORLD_RIGHT - player_width / 2
-
-        self.player.change_x = move
-        on_ladder = self.engine.is_on_ladder()
-
-        if on_ladder:
-            if self.up and not self.down:
-                player_height = self.player.height
-                next_y = self.player.center_y + LADDER_SPEED
-                if next_y + player_height / 2 > WORLD_TOP:
-                    self.player.change_y = 0
-                    self.player.center_y = WORLD_TOP - player_height / 2
-                else:
-                    self.player.change_y = LADDER_SPEED
-                is_moving_on_ladder = True
-            elif self.down and not self.up:
-                player_height = self.player.height
-                next_y = self.player.center_y - LADDER_SPEED
-                if next_y - player_height / 2 < WORLD_BOTTOM:
-                    self.player.change_y = 0
-                    self.player.center_y = WORLD_BOTTOM + player_height / 2
-                else:
-                    self.player.change_y = -LADDER_SPEED
-                is_moving_on_ladder = True
-            else:
-                self.player.change_y = 0
-
-        grounded = self.engine.can_jump(y_distance=6)
-        is_walking = (is_moving_horizontally and grounded and not on_ladder and not self.was_jumping)
-        self.effects.set_walk_sound(is_walking)
-
-        if not on_ladder:
-            if not self.was_jumping and self.player.change_y > 0:
-                self.effects.create_jump_effect(self.player.center_x, self.player.center_y)
-                self.was_jumping = True
-            elif self.was_jumping and grounded:
-                self.effects.create_land_effect(self.player.center_x, self.player.center_y)
-                self.was_jumping = False
-
-            if grounded:
-                self.time_since_ground = 0
-                self.jumps_left = MAX_JUMPS
-            else:
-                self.time_since_ground += delta_time
-
-            if self.jump_buffer_timer > 0:
-                self.jump_buffer_timer -= delta_time
-
-            want_jump = self.jump_pressed or (self.jump_buffer_timer > 0)
-            if want_jump:
-                can_coyote = (self.time_since_ground <= COYOTE_TIME)
-                if grounded or can_coyote:
-                    self.engine.jump(JUMP_SPEED)
-                    self.jump_buffer_timer = 0
-        else:
-            self.was_jumping = True
-            self.time_since_ground = 0
-
-        self.engine.update()
-
-        player_height = self.player.height
-        if self.player.center_y - player_height / 2 < WORLD_BOTTOM:
-            self.player.center_y = WORLD_BOTTOM + player_height / 2
-            self.player.change_y = 0
-            if self.player.center_y < WORLD_BOTTOM + 100:
-                self.player.center_x, self.player.center_y = self.current_level.spawn_point
-
-        if self.player.center_y + player_height / 2 > WORLD_TOP:
-            self.player.center_y = WORLD_TOP - player_height / 2
-            self.player.change_y = 0
-
-        is_jumping = (self.player.change_y > 0 and not on_ladder)
+        self.tick_accumulator += min(delta_time, MAX_FRAME_TIME)
+        while self.tick_accumulator >= TICK_DT and not self.game_completed:
+            self.tick_accumulator -= TICK_DT
+            self.feed_replay()
+            self.tick()
+
+    def tick(self):
+        profiler = self.profiler
+        profiler.start("update")
+        inputs = SimInputs(
+            self.left, self.right, self.up, self.down, self.jump_pressed,
+            self.pressed_actions, self.released_actions
+        )
+        self.pressed_actions.clear()
+        self.released_actions.clear()
+
+        state = self.state
+        body = state.body
+        self.previous_player_position = (body.x, body.y)
+        self.previous_camera_position = state.camera
+        profiler.lap("input")
+        events = step(state, inputs, TICK_DT)
+        self.tick_count += 1
+
+        self.player.center_x = body.x
+        self.player.center_y = body.y
+        self.player.change_x = body.change_x
+        self.player.change_y = body.change_y
+        self.effects.set_walk_sound(state.walking)
 
         self.player_animation.update(
-            delta_time,
-            is_moving_horizontally,
-            is_jumping,
-            self.is_facing_right,
-            grounded,
-            on_ladder,
-            is_moving_on_ladder
+            TICK_DT,
+            state.moving,
+            state.jumping,
+            body.facing_right,
+            state.grounded,
+            state.on_ladder,
+            state.moving_on_ladder
         )
 
         current_sprite = self.player_animation.get_current_sprite()
         if current_sprite:
             self.player.texture = current_sprite
-            self.player.scale_x = 1 if self.is_facing_right else -1
-
-        self.effects.update(delta_time, self.player, grounded)
-
-        keys_collected = arcade.check_for_collision_with_list(self.player, self.current_level.keys)
-        for key in keys_collected:
-            key.remove_from_sprite_lists()
-            self.effects.play_key_sound()
-
-        doors_collided = arcade.check_for_collision_with_list(self.player, self.current_level.doors)
-        for door in doors_collided:
-            if len(self.current_level.keys) == 0:
-                current_index = self.levels.index(self.current_level)
-                if current_index + 1 < len(self.levels):
-                    self.switch_to_level(current_index + 1)
-                else:
-                    self.game_completed = True
-                    self.total_game_time = int(time.time() - self.game_start_time)
-                break
 
-        target = (self.player.center_x, self.player.center_y)
-        cx, cy = self.world_camera.position
-        smooth = (
-            cx + (target[0] - cx) * CAMERA_LERP,
-            cy + (target[1] - cy) * CAMERA_LERP
-        )
-        half_w = self.world_camera.viewport_width / 2
-        half_h = self.world_camera.viewport_height / 2
-        cam_x = max(half_w, min(WORLD_WIDTH - half_w, smooth[0]))
-        cam_y = max(half_h, min(WORLD_HEIGHT - half_h, smooth[1]))
-        self.world_camera.position = (cam_x, cam_y)
         self.gui_camera.position = (SCREEN_W / 2, SCREEN_H / 2)
+        profiler.lap("animation")
+
+        for event in events:
+            self.handle_event(event)
+        profiler.lap("events")
+
+        self.effects.update(TICK_DT, self.player, state.grounded)
+        profiler.lap("effects")
+
+    def handle_event(self, event):
+        kind = event[0]
+        if kind == "jump":
+            self.effects.create_jump_effect(event[1], event[2])
+        elif kind == "land":
+            self.effects.create_land_effect(event[1], event[2])
+        elif kind == "respawn":
+            self.previous_player_position = (self.state.body.x, self.state.body.y)
+        elif kind == "key":
+            self.current_level.collect_key(event[1])
+            self.effects.play_key_sound()
+        elif kind == "door":
+            current_index = self.current_level_index
+            if current_index + 1 < len(self.level_paths):
+                self.switch_to_level(current_index + 1)
+            else:
+                self.game_completed = True
+                self.total_game_time = int(time.time() - self.game_start_time)
+
+
+def serve():
+    """Прогретый процесс для лаунчера: все загружено заранее, окно скрыто до команды START"""
+    game = Platformer(visible=False)
+    # Первый кадр в скрытое окно компилирует шейдеры и собирает кэш статичных слоев
+    game.on_draw()
+    warm_start.send(warm_start.READY)
+    if warm_start.wait_for_command() != warm_start.START:
+        game.close()
+        return
+
+    # Настройки могли поменяться в меню, пока процесс ждал
+    config.load()
+    game.effects.update_audio_settings()
+    game.game_start_time = time.time()
+    game.set_visible(True)
+    game.activate()
+    arcade.schedule_once(lambda delta_time: warm_start.send(warm_start.RUNNING), 0)
+    arcade.run()
+    warm_start.send(warm_start.EXIT)
 
 
 def main():
-    game = Platformer()
+    parser = argparse.ArgumentParser(description=TITLE)
+    parser.add_argument("--record", metavar="FILE", help="записать ввод в файл")
+    parser.add_argument("--replay", metavar="FILE", help="воспроизвести записанный ввод")
+    parser.add_argument("--serve", action="store_true", help="ждать команды лаунчера (см. warm_start.py)")
+    parser.add_argument("--level", metavar="FILE", action="append",
+                        help="играть только указанные уровни, например levels/demo_entities.json")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+        return
+
+    recording = Replay() if args.record else None
+    playback = Replay.load(args.replay) if args.replay else None
+    game = Platformer(recording, playback, level_paths=args.level)
     game.setup()
     arcade.run()
+    if recording is not None:
+        recording.save(args.record)
 
 
 if __name__ == "__main__":
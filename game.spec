@@ -5,7 +5,7 @@ a = Analysis(
     ['game.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('assets.pack', '.'), ('levels', 'levels')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import re
+import struct
+from array import array
+
+from assets_pack import BASE_DIR, cache_dir
+
+LEVELS_DIR = os.path.join(BASE_DIR, "levels")
+CACHE_DIR = cache_dir(".level_cache")
+FORMAT_VERSION = 3
+MAGIC = b"ETCL"
+
+LAYERS = ("walls", "ladders", "keys", "doors", "hazards", "foreground")
+ENTITY_KINDS = ("enemy", "block", "platform")
+
+
+class LevelFormatError(Exception):
+    pass
+
+
+class LevelData:
+    """Скомпилированный уровень: позиции спрайтов хранятся в упакованных массивах"""
+
+    def __init__(self, spawn, color, background=None, layers=None, entities=None):
+        self.spawn = spawn
+        self.color = color
+        # Слои фона: (файл, масштаб тайла, коэффициент параллакса)
+        self.background = background or []
+        self.layers = layers or {}
+        # Группы сущностей: (вид, кадры, масштаб, (dx, dy) пути, скорость, координаты)
+        self.entities = entities or []
+
+    def groups(self, layer):
+        return self.layers.get(layer, [])
+
+    def positions(self, layer):
+        for texture, scale, coords in self.groups(layer):
+            for i in range(0, len(coords), 2):
+                yield texture, scale, coords[i], coords[i + 1]
+
+
+def list_levels(directory=LEVELS_DIR):
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if re.fullmatch(r"level_\d+\.json", name)]
+    names.sort(key=lambda name: int(re.search(r"\d+", name).group()))
+    return [os.path.join(directory, name) for name in names]
+
+
+def _required(group, key, where):
+    try:
+        return group[key]
+    except (KeyError, TypeError):
+        raise LevelFormatError(f"{where}: нет обязательного поля \"{key}\"")
+
+
+def compile_level(data):
+    try:
+        spawn = (float(data["spawn"][0]), float(data["spawn"][1]))
+        color = tuple(int(c) for c in data["color"][:3])
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise LevelFormatError(f"Некорректное описание уровня: {e}")
+
+    background = data.get("background") or []
+    if isinstance(background, dict):
+        background = [background]
+    background = [
+        (_required(layer, "file", f"background[{i}]"),
+         float(layer.get("tile_scale", 1.0)), float(layer.get("parallax", 1.0)))
+        for i, layer in enumerate(background)
+    ]
+
+    layers = {}
+    for name, groups in data.get("layers", {}).items():
+        if name not in LAYERS:
+            raise LevelFormatError(f"Неизвестный слой: {name}")
+        compiled = []
+        for i, group in enumerate(groups):
+            texture = _required(group, "texture", f"{name}[{i}]")
+            coords = array("f")
+            for x, y, count, dx, dy in group.get("runs", []):
+                for i in range(int(count)):
+                    coords.append(x + i * dx)
+                    coords.append(y + i * dy)
+            for x, y in group.get("points", []):
+                coords.append(x)
+                coords.append(y)
+            compiled.append((texture, float(group.get("scale", 1.0)), coords))
+        layers[name] = compiled
+
+    entities = []
+    for i, group in enumerate(data.get("entities", [])):
+        kind = _required(group, "kind", f"entities[{i}]")
+        if kind not in ENTITY_KINDS:
+            raise LevelFormatError(f"Неизвестный вид сущности: {kind}")
+        coords = array("f")
+        for x, y in group.get("points", []):
+            coords.append(x)
+            coords.append(y)
+        frames = list(group.get("frames") or [_required(group, "texture", f"entities[{i}]")])
+        dx, dy = group.get("path", (0, 0))
+        entities.append((kind, frames, float(group.get("scale", 1.0)), (float(dx), float(dy)),
+                         float(group.get("speed", 0.0)), coords))
+
+    return LevelData(spawn, color, background, layers, entities)
+
+
+def _pack_str(out, value):
+    raw = value.encode("utf-8")
+    out += struct.pack("<H", len(raw))
+    out += raw
+
+
+def _unpack_str(buf, offset):
+    (length,) = struct.unpack_from("<H", buf, offset)
+    offset += 2
+    return bytes(buf[offset:offset + length]).decode("utf-8"), offset + length
+
+
+def pack_level(level):
+    out = bytearray(MAGIC)
+    out += struct.pack("<H", FORMAT_VERSION)
+    out += struct.pack("<2f3B", level.spawn[0], level.spawn[1], *level.color)
+    out += struct.pack("<B", len(level.background))
+    for background_file, tile_scale, parallax in level.background:
+        _pack_str(out, background_file)
+        out += struct.pack("<2d", tile_scale, parallax)
+    out += struct.pack("<B", len(level.layers))
+    for name, groups in level.layers.items():
+        _pack_str(out, name)
+        out += struct.pack("<H", len(groups))
+        for texture, scale, coords in groups:
+            _pack_str(out, texture)
+            out += struct.pack("<dI", scale, len(coords) // 2)
+            out += coords.tobytes()
+    out += struct.pack("<H", len(level.entities))
+    for kind, frames, scale, path, speed, coords in level.entities:
+        _pack_str(out, kind)
+        out += struct.pack("<B", len(frames))
+        for frame in frames:
+            _pack_str(out, frame)
+        out += struct.pack("<4dI", scale, path[0], path[1], speed, len(coords) // 2)
+        out += coords.tobytes()
+    return bytes(out)
+
+
+def unpack_level(buf):
+    if buf[:4] != MAGIC:
+        raise LevelFormatError("Неверная сигнатура кэша уровня")
+    offset = 4
+    (version,) = struct.unpack_from("<H", buf, offset)
+    if version != FORMAT_VERSION:
+        raise LevelFormatError(f"Неподдерживаемая версия кэша: {version}")
+    offset += 2
+    sx, sy, r, g, b = struct.unpack_from("<2f3B", buf, offset)
+    offset += struct.calcsize("<2f3B")
+    (background_count,) = struct.unpack_from("<B", buf, offset)
+    offset += 1
+    background = []
+    for _ in range(background_count):
+        background_file, offset = _unpack_str(buf, offset)
+        tile_scale, parallax = struct.unpack_from("<2d", buf, offset)
+        offset += 16
+        background.append((background_file, tile_scale, parallax))
+    (layer_count,) = struct.unpack_from("<B", buf, offset)
+    offset += 1
+
+    layers = {}
+    for _ in range(layer_count):
+        name, offset = _unpack_str(buf, offset)
+        (group_count,) = struct.unpack_from("<H", buf, offset)
+        offset += 2
+        groups = []
+        for _ in range(group_count):
+            texture, offset = _unpack_str(buf, offset)
+            scale, count = struct.unpack_from("<dI", buf, offset)
+            offset += struct.calcsize("<dI")
+            coords = array("f")
+            coords.frombytes(buf[offset:offset + count * 8])
+            offset += count * 8
+            groups.append((texture, scale, coords))
+        layers[name] = groups
+
+    (entity_count,) = struct.unpack_from("<H", buf, offset)
+    offset += 2
+    entities = []
+    for _ in range(entity_count):
+        kind, offset = _unpack_str(buf, offset)
+        (frame_count,) = struct.unpack_from("<B", buf, offset)
+        offset += 1
+        frames = []
+        for _ in range(frame_count):
+            frame, offset = _unpack_str(buf, offset)
+            frames.append(frame)
+        scale, dx, dy, speed, count = struct.unpack_from("<4dI", buf, offset)
+        offset += struct.calcsize("<4dI")
+        coords = array("f")
+        coords.frombytes(buf[offset:offset + count * 8])
+        offset += count * 8
+        entities.append((kind, frames, scale, (dx, dy), speed, coords))
+
+    return LevelData((sx, sy), (r, g, b), background, layers, entities)
+
+
+def cache_path(raw):
+    digest = hashlib.sha1(raw)
+    digest.update(struct.pack("<H", FORMAT_VERSION))
+    return os.path.join(CACHE_DIR, digest.hexdigest() + ".bin")
+
+
+def load_level(path):
+    """Читает уровень из бинарного кэша, а при промахе компилирует JSON и обновляет кэш"""
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    cached = cache_path(raw)
+    if os.path.exists(cached):
+        try:
+            with open(cached, "rb") as f:
+                return unpack_level(f.read())
+        except (OSError, struct.error, LevelFormatError):
+            pass
+
+    try:
+        level = compile_level(json.loads(raw))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise LevelFormatError(f"{path}: {e}")
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = cached + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pack_level(level))
+        os.replace(tmp_path, cached)
+    except OSError:
+        pass
+    return level
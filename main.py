@@ -1,13 +1,49 @@
 import sys
 import os
-import subprocess
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+from collections import OrderedDict
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout,
                              QWidget, QLabel, QHBoxLayout, QDialog, QCheckBox,
                              QSlider, QMessageBox)
-from PyQt6.QtGui import QIcon, QPalette, QColor, QPixmap
-from PyQt6.QtCore import Qt, QUrl
+from PyQt6.QtGui import QIcon, QPalette, QColor, QPixmap, QImage
+from PyQt6.QtCore import (Qt, QUrl, QProcess, QObject, QRunnable, QThreadPool,
+                          QTimer, pyqtSignal)
 from config import config  # Импортируем глобальную конфигурацию
+import warm_start
+
+BACKGROUND_FILES = {
+    "light": "assets/etc_background.png",
+    "dark": "assets/etc_dark_background.jpg",
+}
+# Сколько отмасштабированных фонов держать в памяти
+BACKGROUND_CACHE_SIZE = 8
+RESIZE_DEBOUNCE_MS = 120
+
+
+class ScaleSignals(QObject):
+    # тема, ширина, высота, исходная картинка, отмасштабированная картинка
+    done = pyqtSignal(str, int, int, QImage, QImage)
+
+
+class ScaleTask(QRunnable):
+    """Масштабирует фон в пуле потоков; QImage, в отличие от QPixmap, можно трогать вне UI-потока"""
+
+    def __init__(self, signals, theme, width, height, source=None):
+        super().__init__()
+        self.signals = signals
+        self.theme = theme
+        self.width = width
+        self.height = height
+        self.source = source
+
+    def run(self):
+        source = self.source
+        if source is None or source.isNull():
+            source = QImage(BACKGROUND_FILES[self.theme])
+        scaled = QImage()
+        if not source.isNull():
+            scaled = source.scaled(self.width, self.height, Qt.AspectRatioMode.IgnoreAspectRatio,
+                                   Qt.TransformationMode.SmoothTransformation)
+        self.signals.done.emit(self.theme, self.width, self.height, source, scaled)
 
 
 class SettingsDialog(QDialog):
@@ -122,18 +158,23 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Escape from the Castle")
         self.setGeometry(100, 100, 800, 600)
 
-        try:
-            self.background_image = QPixmap("assets/etc_background.png")
-            self.dark_background_image = QPixmap("assets/etc_dark_background.jpg")
-        except Exception as e:
-            self.background_image = QPixmap()
-            self.dark_background_image = QPixmap()
+        # Исходные картинки фона грузятся в фоне при первом масштабировании
+        self.background_images = {}
+        self.scaled_backgrounds = OrderedDict()
+        self.pending_scales = set()
+        self.scale_signals = ScaleSignals(self)
+        self.scale_signals.done.connect(self.background_scaled)
 
+        # Пока готовится точная картинка, QLabel растягивает предыдущую
         self.background = QLabel(self)
-        self.background.setPixmap(self.background_image.scaled(self.size(), Qt.AspectRatioMode.IgnoreAspectRatio,
-                                                               Qt.TransformationMode.SmoothTransformation))
+        self.background.setScaledContents(True)
         self.background.setGeometry(0, 0, self.width(), self.height())
 
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_DEBOUNCE_MS)
+        self.resize_timer.timeout.connect(self.update_background)
+
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
 
@@ -198,30 +239,127 @@ class MainWindow(QMainWindow):
 
         self.apply_theme()
 
+        # QtMultimedia загружается после первого показа окна, см. showEvent
+        self.music_player = None
+        self.audio_output = None
+
+        # Процесс игры запускается заранее и грузит все, пока открыто меню
+        self.game_process = None
+        self.game_ready = False
+        self.game_running = False
+        self.start_requested = False
+        self.closing = False
+        self.spawn_game_process()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.music_player is None:
+            QTimer.singleShot(0, self.init_music)
+
+    def init_music(self):
+        if self.music_player is not None:
+            return
+        from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+
         self.music_player = QMediaPlayer()
         self.audio_output = QAudioOutput()
         self.music_player.setAudioOutput(self.audio_output)
         self.music_url = QUrl.fromLocalFile("music/background_music.mp3")
         self.music_player.setSource(self.music_url)
         self.audio_output.setVolume(config.music_volume)
-        self.play_background_music()
+        if not (self.game_running or self.start_requested):
+            self.play_background_music()
 
-    def start_game(self):
-        """Запускает игру"""
-        self.music_player.stop()
-        self.hide()
-
-        try:
-            game_process = subprocess.Popen([sys.executable, "game.py"])
-            game_process.wait()
+    def stop_background_music(self):
+        if self.music_player is not None:
+            self.music_player.stop()
+
+    def spawn_game_process(self):
+        process = QProcess(self)
+        process.setProgram(sys.executable)
+        process.setArguments(["game.py", "--serve"])
+        process.setProcessChannelMode(QProcess.ProcessChannelMode.ForwardedErrorChannel)
+        process.readyReadStandardOutput.connect(self.read_game_output)
+        process.finished.connect(self.game_finished)
+        process.errorOccurred.connect(self.game_error)
+        self.game_process = process
+        self.game_ready = False
+        self.game_running = False
+        process.start()
 
+    def start_game(self):
+        """Запускает игру в прогретом процессе, не блокируя меню"""
+        self.stop_background_music()
+        self.play_button.setEnabled(False)
+        self.start_requested = True
+        if self.game_process is None:
+            self.spawn_game_process()
+        elif self.game_ready:
+            self.send_start()
+
+    def send_start(self):
+        self.start_requested = False
+        self.game_running = True
+        self.game_process.write((warm_start.START + "\n").encode())
+
+    def read_game_output(self):
+        process = self.sender()
+        while process.canReadLine():
+            line = bytes(process.readLine()).decode("utf-8", "replace")
+            message = warm_start.parse(line)
+            if message is None:
+                print(line, end="")
+            elif message == warm_start.READY:
+                self.game_ready = True
+                if self.start_requested:
+                    self.send_start()
+            elif message == warm_start.RUNNING:
+                self.hide()
+
+    def game_finished(self, exit_code, exit_status):
+        process = self.sender()
+        process.deleteLater()
+        if process is not self.game_process or self.closing:
+            return
+        was_running = self.game_running
+        self.game_process = None
+        self.game_ready = False
+        self.game_running = False
+
+        if was_running or self.start_requested:
+            self.start_requested = False
             self.show()
+            self.play_button.setEnabled(True)
             self.play_background_music()
-
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Не удалось запустить игру:\n{str(e)}")
+            if exit_status == QProcess.ExitStatus.CrashExit or exit_code != 0:
+                QMessageBox.critical(self, "Ошибка", f"Игра завершилась с ошибкой (код {exit_code})")
+                return
+            # Следующая игра снова стартует из прогретого процесса
+            self.spawn_game_process()
+
+    def game_error(self, error):
+        if error != QProcess.ProcessError.FailedToStart:
+            return
+        process = self.sender()
+        if process is self.game_process:
+            self.game_process = None
+            self.game_ready = False
+        if self.start_requested:
+            self.start_requested = False
             self.show()
+            self.play_button.setEnabled(True)
             self.play_background_music()
+            QMessageBox.critical(self, "Ошибка", f"Не удалось запустить игру:\n{process.errorString()}")
+
+    def closeEvent(self, event):
+        self.closing = True
+        process = self.game_process
+        if process is not None and process.state() != QProcess.ProcessState.NotRunning:
+            process.write((warm_start.QUIT + "\n").encode())
+            process.closeWriteChannel()
+            if not process.waitForFinished(1000):
+                process.kill()
+        super().closeEvent(event)
 
     def open_settings(self):
         settings_dialog = SettingsDialog(self)
@@ -238,22 +376,53 @@ class MainWindow(QMainWindow):
             )
 
             # Обновляем музыку в главном меню
-            self.audio_output.setVolume(config.music_volume)
+            if self.audio_output is not None:
+                self.audio_output.setVolume(config.music_volume)
 
             if config.music_enabled:
                 self.play_background_music()
             else:
-                self.music_player.stop()
+                self.stop_background_music()
 
             # Применяем тему
             self.apply_theme()
 
     def resizeEvent(self, event):
-        self.background.setPixmap(self.background_image.scaled(self.size(), Qt.AspectRatioMode.IgnoreAspectRatio,
-                                                               Qt.TransformationMode.SmoothTransformation))
         self.background.setGeometry(0, 0, self.width(), self.height())
+        # Плавное масштабирование дорогое, поэтому ждем, пока размер перестанет меняться
+        self.resize_timer.start()
         super().resizeEvent(event)
 
+    def background_theme(self):
+        return "dark" if config.dark_theme else "light"
+
+    def update_background(self):
+        theme = self.background_theme()
+        width, height = self.width(), self.height()
+        key = (theme, width, height)
+        pixmap = self.scaled_backgrounds.get(key)
+        if pixmap is not None:
+            self.scaled_backgrounds.move_to_end(key)
+            self.background.setPixmap(pixmap)
+            return
+        if key in self.pending_scales:
+            return
+        self.pending_scales.add(key)
+        task = ScaleTask(self.scale_signals, theme, width, height, self.background_images.get(theme))
+        QThreadPool.globalInstance().start(task)
+
+    def background_scaled(self, theme, width, height, source, scaled):
+        key = (theme, width, height)
+        self.pending_scales.discard(key)
+        if source.isNull() or scaled.isNull():
+            return
+        self.background_images[theme] = source
+        self.scaled_backgrounds[key] = QPixmap.fromImage(scaled)
+        while len(self.scaled_backgrounds) > BACKGROUND_CACHE_SIZE:
+            self.scaled_backgrounds.popitem(last=False)
+        if key == (self.background_theme(), self.width(), self.height()):
+            self.background.setPixmap(self.scaled_backgrounds[key])
+
     def toggle_theme(self):
         config.dark_theme = not config.dark_theme
         config.save()
@@ -265,10 +434,7 @@ class MainWindow(QMainWindow):
                 self.set_dark_theme()
                 self.theme_button.setIcon(QIcon("images/moon.png"))
                 self.theme_button.setIconSize(self.theme_button.size())
-                if not self.dark_background_image.isNull():
-                    self.background.setPixmap(
-                        self.dark_background_image.scaled(self.size(), Qt.AspectRatioMode.IgnoreAspectRatio,
-                                                          Qt.TransformationMode.SmoothTransformation))
+                self.update_background()
                 style = "color: white; font-size: 24px; font-weight: bold; background-color: #464646; border: 2px solid #5a5a5a; border-radius: 10px;"
                 self.play_button.setStyleSheet(style)
                 self.settings_button.setStyleSheet(style)
@@ -278,10 +444,7 @@ class MainWindow(QMainWindow):
                 self.set_light_theme()
                 self.theme_button.setIcon(QIcon("images/sun.png"))
                 self.theme_button.setIconSize(self.theme_button.size())
-                if not self.background_image.isNull():
-                    self.background.setPixmap(
-                        self.background_image.scaled(self.size(), Qt.AspectRatioMode.IgnoreAspectRatio,
-                                                     Qt.TransformationMode.SmoothTransformation))
+                self.update_background()
                 style = "color: black; font-size: 24px; font-weight: bold; background-color: #d3d3d3; border: 2px solid #a0a0a0; border-radius: 10px;"
                 self.play_button.setStyleSheet(style)
                 self.settings_button.setStyleSheet(style)
@@ -317,7 +480,7 @@ class MainWindow(QMainWindow):
         self.setPalette(palette)
 
     def play_background_music(self):
-        if config.music_enabled:
+        if config.music_enabled and self.music_player is not None:
             self.music_player.play()
 
 
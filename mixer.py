@@ -0,0 +1,125 @@
+"""Микшер звуковых эффектов с постоянным набором голосов.
+
+У каждой категории звуков свое число голосов (плееров pyglet), которые
+создаются один раз и переиспользуются. Если свободного голоса нет, новый звук
+забирает самый старый голос своей категории. Кроме того, общее число
+одновременно звучащих голосов ограничено MAX_ACTIVE_VOICES: при переполнении
+звук вытесняет голос категории с меньшим или равным приоритетом, а если таких
+нет, не играет. Громкость голоса - общая громкость эффектов, умноженная на
+громкость шины категории из config.audio_buses.
+"""
+import time
+
+import pyglet.media as media
+
+from config import config
+
+CATEGORIES = {
+    "steps": {"voices": 2, "priority": 0},
+    "jump": {"voices": 2, "priority": 1},
+    "pickup": {"voices": 3, "priority": 2},
+}
+MAX_ACTIVE_VOICES = 5
+
+
+class Voice:
+    def __init__(self, category, priority):
+        self.category = category
+        self.priority = priority
+        self.player = media.Player()
+        self.started = 0.0
+        self.gain = 1.0
+
+    @property
+    def busy(self):
+        return self.player.source is not None
+
+    def start(self, source, gain, volume):
+        player = self.player
+        was_busy = self.busy
+        player.queue(source)
+        if was_busy:
+            # Голос еще звучит: переключаемся на новый звук без пересоздания плеера
+            player.next_source()
+        player.volume = gain * volume
+        player.play()
+        self.gain = gain
+        self.started = time.perf_counter()
+
+    def set_volume(self, volume):
+        self.player.volume = self.gain * volume
+
+    def stop(self):
+        if self.busy:
+            self.player.next_source()
+
+    def delete(self):
+        self.player.delete()
+
+
+class Mixer:
+    def __init__(self, sounds, categories=CATEGORIES, max_active=MAX_ACTIVE_VOICES):
+        self.sounds = sounds
+        self.max_active = max_active
+        self.voices = {}
+        for category, settings in categories.items():
+            self.voices[category] = [
+                Voice(category, settings["priority"]) for _ in range(settings["voices"])
+            ]
+
+    def bus_volume(self, category):
+        if not config.sound_effects_enabled:
+            return 0.0
+        return config.sound_effects_volume * config.audio_buses.get(category, 1.0)
+
+    def active_voices(self):
+        return [voice for voices in self.voices.values() for voice in voices if voice.busy]
+
+    def pick_voice(self, category):
+        voices = self.voices[category]
+        for voice in voices:
+            if not voice.busy:
+                break
+        else:
+            return min(voices, key=lambda voice: voice.started)
+
+        active = self.active_voices()
+        if len(active) < self.max_active:
+            return voice
+        priority = voice.priority
+        candidates = [other for other in active if other.priority <= priority]
+        if not candidates:
+            return None
+        victim = min(candidates, key=lambda other: (other.priority, other.started))
+        victim.stop()
+        return voice
+
+    def play(self, category, name, gain=1.0):
+        volume = self.bus_volume(category)
+        if volume <= 0:
+            return None
+        sound = self.sounds.get(name)
+        if sound is None:
+            return None
+        voice = self.pick_voice(category)
+        if voice is None:
+            return None
+        voice.start(sound.source, gain, volume)
+        return voice
+
+    def update_volumes(self):
+        for category, voices in self.voices.items():
+            volume = self.bus_volume(category)
+            for voice in voices:
+                voice.set_volume(volume)
+
+    def stop_all(self):
+        for voices in self.voices.values():
+            for voice in voices:
+                voice.stop()
+
+    def delete(self):
+        for voices in self.voices.values():
+            for voice in voices:
+                voice.delete()
+        self.voices.clear()
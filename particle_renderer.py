@@ -0,0 +1,109 @@
+import arcade
+from arcade.gl import BufferDescription
+from pyglet import gl
+
+VERTEX_SHADER = """
+#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_pos;
+in float in_size;
+in vec4 in_color;
+in float in_lifetime;
+in float in_max_lifetime;
+out vec4 v_color;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_pos, 0.0, 1.0);
+    gl_PointSize = in_size * 2.0;
+    // Частица тает по мере того, как истекает время жизни
+    float fade = clamp(in_lifetime / max(in_max_lifetime, 0.0001), 0.0, 1.0);
+    v_color = vec4(in_color.rgb, in_color.a * fade);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+in vec4 v_color;
+out vec4 f_color;
+
+void main() {
+    vec2 offset = gl_PointCoord - vec2(0.5);
+    if (dot(offset, offset) > 0.25) {
+        discard;
+    }
+    f_color = v_color;
+}
+"""
+
+
+class ParticleRenderer:
+    """Рисует все частицы ParticlePool одним вызовом: точки с размером и цветом из массивов"""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        # В arcade 3.3 у контекста нет константы PROGRAM_POINT_SIZE, хотя enable_only
+        # уже учитывает этот флаг; берем ее у контекста, когда она появится
+        self.program_point_size = getattr(ctx, "PROGRAM_POINT_SIZE", gl.GL_PROGRAM_POINT_SIZE)
+        self.program = ctx.program(vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+        self.capacity = 0
+        self.buffers = ()
+        self.geometry = None
+
+    def allocate(self, capacity):
+        ctx = self.ctx
+        self.capacity = capacity
+        self.buffers = (
+            ctx.buffer(reserve=capacity * 2 * 4),
+            ctx.buffer(reserve=capacity * 4),
+            ctx.buffer(reserve=capacity * 4),
+            ctx.buffer(reserve=capacity * 4),
+            ctx.buffer(reserve=capacity * 4),
+        )
+        position, size, color, lifetime, max_lifetime = self.buffers
+        self.geometry = ctx.geometry(
+            [
+                BufferDescription(position, "2f", ["in_pos"]),
+                BufferDescription(size, "1f", ["in_size"]),
+                BufferDescription(color, "4f1", ["in_color"]),
+                BufferDescription(lifetime, "1f", ["in_lifetime"]),
+                BufferDescription(max_lifetime, "1f", ["in_max_lifetime"]),
+            ],
+            mode=ctx.POINTS
+        )
+
+    def draw(self, pool):
+        count = pool.count
+        if not count:
+            return
+        if pool.capacity > self.capacity:
+            self.allocate(pool.capacity)
+
+        arrays = (pool.position, pool.size, pool.color, pool.lifetime, pool.max_lifetime)
+        for buffer, values in zip(self.buffers, arrays):
+            buffer.write(values[:count])
+        ctx = self.ctx
+        previous_blend = ctx.blend_func
+        ctx.blend_func = ctx.BLEND_DEFAULT
+        try:
+            with ctx.enabled(ctx.BLEND, self.program_point_size):
+                self.geometry.render(self.program, vertices=count)
+        finally:
+            ctx.blend_func = previous_blend
+
+
+_renderers = {}
+
+
+def get_renderer(ctx=None):
+    ctx = ctx or arcade.get_window().ctx
+    renderer = _renderers.get(id(ctx))
+    if renderer is None:
+        renderer = ParticleRenderer(ctx)
+        _renderers[id(ctx)] = renderer
+    return renderer
@@ -0,0 +1,97 @@
+"""Частицы в виде набора массивов NumPy.
+
+Каждое свойство хранится в отдельном массиве, живые частицы занимают первые
+count ячеек. Движение и проверка времени жизни считаются сразу для всех
+частиц, а погибшие ячейки заполняются живыми частицами с конца массива,
+поэтому стоимость кадра не растет от удаления отдельных частиц.
+"""
+import numpy as np
+
+PARTICLE_CAPACITY = 256
+PARTICLE_GRAVITY = 0.1
+
+
+class ParticlePool:
+    def __init__(self, capacity=PARTICLE_CAPACITY, limit=None):
+        self.count = 0
+        # Больше limit частиц одновременно не живет; лишние при выпуске отбрасываются
+        self.limit = limit
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.position = np.zeros((capacity, 2), np.float32)
+        self.velocity = np.zeros((capacity, 2), np.float32)
+        self.size = np.zeros(capacity, np.float32)
+        self.lifetime = np.zeros(capacity, np.float32)
+        self.max_lifetime = np.zeros(capacity, np.float32)
+        self.color = np.zeros((capacity, 4), np.uint8)
+
+    def arrays(self):
+        return (self.position, self.velocity, self.size,
+                self.lifetime, self.max_lifetime, self.color)
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        old = self.arrays()
+        count = self.count
+        self.allocate(max(capacity, self.capacity * 2))
+        for new_array, old_array in zip(self.arrays(), old):
+            new_array[:count] = old_array[:count]
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, x, y, size, speed_x, speed_y, lifetime, color):
+        """Добавляет len(size) частиц в точке (x, y); остальные аргументы - массивы той же длины.
+
+        Возвращает число добавленных частиц: оно меньше запрошенного, если упирается в limit.
+        """
+        added = len(size)
+        if self.limit is not None:
+            added = min(added, self.limit - self.count)
+        if added <= 0:
+            return 0
+        start = self.count
+        self.reserve(start + added)
+        end = start + added
+        self.position[start:end, 0] = x
+        self.position[start:end, 1] = y
+        self.velocity[start:end, 0] = speed_x[:added]
+        self.velocity[start:end, 1] = speed_y[:added]
+        self.size[start:end] = size[:added]
+        self.lifetime[start:end] = lifetime[:added]
+        self.max_lifetime[start:end] = lifetime[:added]
+        self.color[start:end] = color[:added]
+        self.count = end
+        return added
+
+    def update(self, dt):
+        count = self.count
+        if not count:
+            return
+        self.position[:count] += self.velocity[:count]
+        self.velocity[:count, 1] -= PARTICLE_GRAVITY
+        lifetime = self.lifetime[:count]
+        lifetime -= dt
+        dead = np.flatnonzero(lifetime <= 0)
+        if dead.size:
+            self.remove(dead)
+
+    def remove(self, dead):
+        """Удаляет частицы с индексами dead, переставляя на их место живые с конца"""
+        count = self.count
+        alive_count = count - dead.size
+        holes = dead[dead < alive_count]
+        tail = np.arange(alive_count, count)
+        is_dead = np.zeros(count, bool)
+        is_dead[dead] = True
+        sources = tail[~is_dead[alive_count:count]]
+        if holes.size:
+            for values in self.arrays():
+                values[holes] = values[sources]
+        self.count = alive_count
+
+    def clear(self):
+        self.count = 0
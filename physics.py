@@ -0,0 +1,154 @@
+"""Физика платформера на равномерной сетке.
+
+Прямоугольники уровня раскладываются по ячейкам один раз при создании движка,
+поэтому запрос столкновений смотрит только ячейки под игроком и не зависит
+от того, сколько тайлов в уровне. Контакты с полом, потолком и лестницей
+считаются один раз за тик и хранятся в PhysicsGrid.contacts. Лестницы
+берутся из общего индекса триггеров.
+"""
+import math
+
+from collision import grid_cells, overlaps
+
+CELL_SIZE = 64
+
+
+class SpatialGrid:
+    def __init__(self, rects, cell_size=CELL_SIZE):
+        self.rects = rects
+        self.cell_size = cell_size
+        self.cells = {}
+        for index, rect in enumerate(rects):
+            for cell in self.cells_for(rect):
+                self.cells.setdefault(cell, []).append(index)
+
+    def cells_for(self, rect):
+        return grid_cells(rect, self.cell_size)
+
+    def query(self, rect):
+        found = []
+        seen = set()
+        for cell in self.cells_for(rect):
+            for index in self.cells.get(cell, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                if overlaps(rect, self.rects[index]):
+                    found.append(self.rects[index])
+        return found
+
+    def any(self, rect):
+        for cell in self.cells_for(rect):
+            for index in self.cells.get(cell, ()):
+                if overlaps(rect, self.rects[index]):
+                    return True
+        return False
+
+
+class Contacts:
+    def __init__(self):
+        self.on_ladder = False
+        self.grounded = False
+        self.hit_ceiling = False
+        self.landed = False
+
+
+class PhysicsGrid:
+    """Замена arcade.PhysicsEnginePlatformer для прямоугольников уровня"""
+
+    def __init__(self, geometry, triggers, gravity, cell_size=CELL_SIZE):
+        self.solids = SpatialGrid(geometry.solids, cell_size)
+        self.triggers = triggers
+        self.gravity = gravity
+        self.contacts = Contacts()
+
+    def resolve_contacts(self, body, ground_distance):
+        contacts = self.contacts
+        contacts.on_ladder = self.triggers.any(body.rect(), "ladders")
+        contacts.grounded = self.solids.any(body.rect(dy=-ground_distance))
+        contacts.hit_ceiling = False
+        contacts.landed = False
+        return contacts
+
+    def wiggle_until_free(self, body):
+        origin_x, origin_y = body.x, body.y
+        distance = 1
+        while True:
+            for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+                body.x = origin_x + dx * distance
+                body.y = origin_y + dy * distance
+                if not self.solids.any(body.rect()):
+                    return
+            distance *= 2
+
+    def update(self, body):
+        solids = self.solids
+        contacts = self.contacts
+        if not contacts.on_ladder:
+            body.change_y -= self.gravity
+
+        if solids.any(body.rect()):
+            self.wiggle_until_free(body)
+
+        original_x = body.x
+        original_y = body.y
+
+        body.y += body.change_y
+        hits = solids.query(body.rect())
+        if hits:
+            if body.change_y > 0:
+                contacts.hit_ceiling = True
+                while solids.any(body.rect()):
+                    body.y -= 1
+            elif body.change_y < 0:
+                contacts.landed = True
+                for solid in hits:
+                    while overlaps(body.rect(), solid):
+                        body.y += 0.25
+            body.change_y = 0.0
+        body.y = round(body.y, 2)
+
+        if not body.change_x:
+            return
+
+        # Двоичный поиск максимального сдвига по x с подъемом на ступеньки, как в arcade
+        almost_original_y = body.y
+        direction = math.copysign(1, body.change_x)
+        cur_x_change = abs(body.change_x)
+        upper_bound = cur_x_change
+        lower_bound = 0
+        cur_y_change = 0
+
+        while True:
+            body.x = original_x + cur_x_change * direction
+            collided = solids.any(body.rect())
+            if collided:
+                cur_y_change = cur_x_change
+                body.y = original_y + cur_y_change
+                collided = solids.any(body.rect())
+                if collided:
+                    cur_y_change -= cur_x_change
+                else:
+                    while not collided and cur_y_change > 0:
+                        cur_y_change -= 1
+                        body.y = almost_original_y + cur_y_change
+                        collided = solids.any(body.rect())
+                    cur_y_change += 1
+                    collided = False
+
+                if collided:
+                    upper_bound = cur_x_change - 1
+                    if upper_bound - lower_bound <= 0:
+                        cur_x_change = lower_bound
+                        break
+                    cur_x_change = (upper_bound + lower_bound) // 2
+                else:
+                    break
+            else:
+                lower_bound = cur_x_change
+                if upper_bound - lower_bound <= 0:
+                    break
+                cur_x_change = (upper_bound + lower_bound) // 2 + (upper_bound + lower_bound) % 2
+
+        body.x = original_x + cur_x_change * direction
+        body.y = almost_original_y + cur_y_change
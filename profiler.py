@@ -0,0 +1,92 @@
+"""Профилировщик фаз кадра.
+
+Фазы отмечаются вызовами lap(name): каждый вызов записывает время, прошедшее
+с предыдущей отметки или с start(). Замеры последних секунд хранятся в
+кольцевом буфере и выгружаются в формате trace_event (chrome://tracing,
+Perfetto). Выключенный профилировщик только проверяет флаг.
+"""
+import json
+import time
+from collections import deque
+
+PROFILE_SECONDS = 10
+GRAPH_FRAMES = 240
+
+TRACKS = ("update", "draw")
+
+
+class Profiler:
+    def __init__(self, seconds=PROFILE_SECONDS, graph_frames=GRAPH_FRAMES):
+        self.enabled = False
+        self.seconds = seconds
+        # (дорожка, фаза, начало, длительность) за последние seconds секунд
+        self.samples = deque()
+        # Суммы по фазам для графика, по одному словарю на кадр
+        self.frames = deque(maxlen=graph_frames)
+        self.current = {}
+        self.track = TRACKS[0]
+        self.last = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.samples.clear()
+        self.frames.clear()
+        self.current = {}
+        return self.enabled
+
+    def start(self, track):
+        if not self.enabled:
+            return
+        self.track = track
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        duration = now - self.last
+        self.samples.append((self.track, name, self.last, duration))
+        self.current[name] = self.current.get(name, 0.0) + duration * 1000
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frames.append(self.current)
+        self.current = {}
+        oldest = time.perf_counter() - self.seconds
+        samples = self.samples
+        while samples and samples[0][2] < oldest:
+            samples.popleft()
+
+    def trace_events(self, seconds=None):
+        samples = list(self.samples)
+        if seconds is not None and samples:
+            oldest = samples[-1][2] - seconds
+            samples = [sample for sample in samples if sample[2] >= oldest]
+        origin = samples[0][2] if samples else 0.0
+
+        events = []
+        for tid, track in enumerate(TRACKS, start=1):
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                           "args": {"name": track}})
+        for track, name, start, duration in samples:
+            events.append({
+                "name": name,
+                "cat": track,
+                "ph": "X",
+                "ts": (start - origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": 1,
+                "tid": TRACKS.index(track) + 1,
+            })
+        return events
+
+    def export(self, path, seconds=None):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events(seconds), "displayTimeUnit": "ms"}, f)
+        return path
+
+
+# Общий выключенный экземпляр для кода, которому профилировщик не передали
+NULL_PROFILER = Profiler(graph_frames=0)
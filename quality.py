@@ -0,0 +1,74 @@
+"""Уровни качества эффектов и регулятор, который переключает их по времени кадра.
+
+Уровень задается в game_config.json ключом effects_quality: "low", "medium",
+"high" или "auto". В режиме auto регулятор смотрит на среднее время последних
+кадров: если кадр не укладывается в бюджет (интервал отрисовки окна, по
+умолчанию DEFAULT_FRAME_BUDGET), качество снижается, а при
+заметном запасе возвращается обратно. При записи, воспроизведении и замерах
+auto заменяется на PINNED_QUALITY, чтобы нагрузка от эффектов не зависела
+от скорости машины.
+"""
+from collections import deque
+
+# Жесткий потолок частиц независимо от уровня качества
+MAX_PARTICLES = 4096
+
+QUALITY_TIERS = {
+    "low": {"max_particles": 256, "emission": 0.35, "lifetime": 0.6, "shake": 0.0},
+    "medium": {"max_particles": 1024, "emission": 0.7, "lifetime": 0.8, "shake": 0.5},
+    "high": {"max_particles": MAX_PARTICLES, "emission": 1.0, "lifetime": 1.0, "shake": 1.0},
+}
+TIER_ORDER = ("low", "medium", "high")
+AUTO = "auto"
+PINNED_QUALITY = "high"
+
+DEFAULT_FRAME_BUDGET = 1 / 60
+FRAME_WINDOW = 60
+OVERRUN = 1.1
+HEADROOM = 0.7
+
+
+def pinned(quality):
+    """Фиксированный уровень вместо auto"""
+    return quality if quality in QUALITY_TIERS else PINNED_QUALITY
+
+
+class EffectsGovernor:
+    def __init__(self, quality=AUTO, target_frame_time=DEFAULT_FRAME_BUDGET):
+        self.adaptive = quality not in QUALITY_TIERS
+        self.level = TIER_ORDER.index(quality) if not self.adaptive else len(TIER_ORDER) - 1
+        self.target_frame_time = target_frame_time
+        self.frame_times = deque(maxlen=FRAME_WINDOW)
+        self.total = 0.0
+
+    @property
+    def name(self):
+        return TIER_ORDER[self.level]
+
+    @property
+    def tier(self):
+        return QUALITY_TIERS[self.name]
+
+    def record_frame(self, frame_time):
+        """Учитывает время очередного кадра; возвращает True, если уровень изменился"""
+        if not self.adaptive:
+            return False
+        frame_times = self.frame_times
+        if len(frame_times) == frame_times.maxlen:
+            self.total -= frame_times[0]
+        frame_times.append(frame_time)
+        self.total += frame_time
+        if len(frame_times) < frame_times.maxlen:
+            return False
+
+        average = self.total / len(frame_times)
+        if average > self.target_frame_time * OVERRUN and self.level > 0:
+            self.level -= 1
+        elif average < self.target_frame_time * HEADROOM and self.level < len(TIER_ORDER) - 1:
+            self.level += 1
+        else:
+            return False
+        # После переключения набираем новое окно, чтобы уровень не скакал каждый кадр
+        frame_times.clear()
+        self.total = 0.0
+        return True
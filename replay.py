@@ -0,0 +1,76 @@
+"""Запись и воспроизведение ввода.
+
+В файл попадают все нажатия и отпускания клавиш вместе с номером тика, перед
+которым они пришли. Симуляция идет фиксированными тиками, а эффекты берут
+случайные числа из генератора с сохраненным зерном, поэтому при
+воспроизведении игра проходит точно так же, как при записи.
+"""
+import os
+import random
+import struct
+
+MAGIC = b"ETCR"
+FORMAT_VERSION = 1
+
+PRESS = 0
+RELEASE = 1
+
+HEADER = struct.Struct("<4sHIHI")
+RECORD = struct.Struct("<IBI")
+
+
+class ReplayFormatError(Exception):
+    pass
+
+
+class Replay:
+    def __init__(self, seed=None, level=0, events=None):
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.level = level
+        # (тик, PRESS/RELEASE, код клавиши) в порядке поступления
+        self.events = events or []
+        self.position = 0
+
+    def record(self, tick, kind, key):
+        self.events.append((tick, kind, key))
+
+    def due(self, tick):
+        """События, которые нужно подать перед тиком с номером tick"""
+        events = self.events
+        while self.position < len(events) and events[self.position][0] <= tick:
+            yield events[self.position]
+            self.position += 1
+
+    def finished(self):
+        return self.position >= len(self.events)
+
+    def pack(self):
+        out = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, self.seed, self.level, len(self.events)))
+        for event in self.events:
+            out += RECORD.pack(*event)
+        return bytes(out)
+
+    @classmethod
+    def unpack(cls, buf):
+        if len(buf) < HEADER.size:
+            raise ReplayFormatError("Файл записи обрезан")
+        magic, version, seed, level, count = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ReplayFormatError("Неверная сигнатура файла записи")
+        if version != FORMAT_VERSION:
+            raise ReplayFormatError(f"Неподдерживаемая версия записи: {version}")
+        if len(buf) < HEADER.size + count * RECORD.size:
+            raise ReplayFormatError("Файл записи обрезан")
+        events = list(RECORD.iter_unpack(buf[HEADER.size:HEADER.size + count * RECORD.size]))
+        return cls(seed, level, events)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.pack())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.unpack(f.read())
@@ -0,0 +1,328 @@
+"""Игровая логика без окна и OpenGL.
+
+step(state, inputs, dt) выполняет один тик: движение, лестницы, койот-тайм,
+буфер прыжка, ключи, двери и камеру. Скорости заданы в пикселях за тик, а тики
+идут с постоянной частотой TICK_RATE независимо от частоты кадров. Оконная
+игра вызывает ту же функцию, поэтому прогон без окна дает точно такой же результат.
+"""
+from collision import image_bounds, image_size, merge_rects, placed_rect
+from entities import EntityStore
+from level_format import load_level
+from physics import PhysicsGrid
+from profiler import NULL_PROFILER
+from triggers import TriggerIndex
+
+TICK_RATE = 60
+TICK_DT = 1 / TICK_RATE
+
+GRAVITY = 4
+MOVE_SPEED = 6
+JUMP_SPEED = 20
+LADDER_SPEED = 3
+JUMP_CUT = 0.45
+GROUND_CHECK_DISTANCE = 6
+
+COYOTE_TIME = 0.08
+JUMP_BUFFER = 0.12
+MAX_JUMPS = 1
+
+CAMERA_LERP = 0.12
+
+WORLD_WIDTH = 2000
+WORLD_HEIGHT = 900
+WORLD_LEFT = 0
+WORLD_RIGHT = WORLD_WIDTH
+WORLD_BOTTOM = 0
+WORLD_TOP = WORLD_HEIGHT
+
+PLAYER_IMAGE = "images/player/walk_1.png"
+
+
+class LevelGeometry:
+    """Прямоугольники уровня (left, bottom, right, top), по которым считается физика"""
+
+    def __init__(self, spawn, solids, ladders, keys, doors, hazards, entities=()):
+        self.spawn = spawn
+        self.solids = solids
+        self.ladders = ladders
+        self.keys = keys
+        self.doors = doors
+        self.hazards = hazards
+        # Группы подвижных сущностей в формате LevelData.entities
+        self.entities = entities
+
+    @classmethod
+    def from_data(cls, data):
+        def rects(layer):
+            return [placed_rect(texture, scale, x, y) for texture, scale, x, y in data.positions(layer)]
+
+        return cls(
+            data.spawn,
+            merge_rects(rects("walls")),
+            rects("ladders"),
+            rects("keys"),
+            rects("doors"),
+            rects("hazards"),
+            data.entities
+        )
+
+
+def load_geometry(path):
+    return LevelGeometry.from_data(load_level(path))
+
+
+class Body:
+    def __init__(self, x, y, width, height, hit_box):
+        self.x = x
+        self.y = y
+        self.change_x = 0.0
+        self.change_y = 0.0
+        self.width = width
+        self.height = height
+        self.hit_box = hit_box
+        self.facing_right = True
+
+    def rect(self, dx=0.0, dy=0.0):
+        left, bottom, right, top = self.hit_box
+        if not self.facing_right:
+            left, right = -right, -left
+        x = self.x + dx
+        y = self.y + dy
+        return (x + left, y + bottom, x + right, y + top)
+
+
+def player_body(x=0.0, y=0.0):
+    width, height = image_size(PLAYER_IMAGE)
+    return Body(x, y, width, height, image_bounds(PLAYER_IMAGE))
+
+
+class SimInputs:
+    """Состояние клавиш на кадр; pressed/released - действия, нажатые или отпущенные с прошлого кадра"""
+
+    def __init__(self, left=False, right=False, up=False, down=False, jump=False,
+                 pressed=(), released=()):
+        self.left = left
+        self.right = right
+        self.up = up
+        self.down = down
+        self.jump = jump
+        self.pressed = frozenset(pressed)
+        self.released = frozenset(released)
+
+
+class SimState:
+    def __init__(self, geometry, body, viewport, camera=None, keys_alive=None):
+        self.geometry = geometry
+        self.body = body
+        self.viewport = viewport
+        self.camera = tuple(camera) if camera else (viewport[0] / 2, viewport[1] / 2)
+        self.keys_alive = list(keys_alive) if keys_alive is not None else [True] * len(geometry.keys)
+        self.triggers = TriggerIndex.from_geometry(geometry, self.keys_alive)
+        self.physics = PhysicsGrid(geometry, self.triggers, GRAVITY)
+        self.entities = EntityStore.from_groups(geometry.entities)
+
+        self.last_direction = 1
+        self.jump_buffer_timer = 0.0
+        self.time_since_ground = 999.0
+        self.jumps_left = MAX_JUMPS
+        self.was_jumping = False
+
+        self.grounded = False
+        self.on_ladder = False
+        self.moving = False
+        self.moving_on_ladder = False
+        self.jumping = False
+        self.walking = False
+
+        self.frame = 0
+        self.events = []
+        self.profiler = NULL_PROFILER
+
+
+def create_state(geometry, viewport, camera=None, keys_alive=None):
+    body = player_body(*geometry.spawn)
+    return SimState(geometry, body, viewport, camera, keys_alive)
+
+
+def apply_edges(state, inputs):
+    body = state.body
+    if "left" in inputs.pressed:
+        state.last_direction = -1
+    if "right" in inputs.pressed:
+        state.last_direction = 1
+    if "jump" in inputs.pressed:
+        state.jump_buffer_timer = JUMP_BUFFER
+    if "jump" in inputs.released and body.change_y > 0:
+        body.change_y *= JUMP_CUT
+
+
+def update_camera(state):
+    body = state.body
+    cx, cy = state.camera
+    smooth_x = cx + (body.x - cx) * CAMERA_LERP
+    smooth_y = cy + (body.y - cy) * CAMERA_LERP
+    half_w = state.viewport[0] / 2
+    half_h = state.viewport[1] / 2
+    state.camera = (
+        max(half_w, min(WORLD_WIDTH - half_w, smooth_x)),
+        max(half_h, min(WORLD_HEIGHT - half_h, smooth_y))
+    )
+
+
+def step(state, inputs, dt):
+    """Один тик игры. Возвращает список событий: jump, land, key, door, respawn,
+    а также enter/exit для триггеров, с которыми игрок начал или перестал пересекаться"""
+    physics = state.physics
+    body = state.body
+    profiler = state.profiler
+    events = state.events = []
+    state.frame += 1
+
+    apply_edges(state, inputs)
+
+    entities = state.entities
+    entities.update(dt, body.rect())
+    profiler.lap("entities")
+
+    move = 0
+    is_moving_horizontally = False
+    is_moving_on_ladder = False
+
+    if inputs.left and not inputs.right:
+        move = -MOVE_SPEED
+        is_moving_horizontally = True
+        body.facing_right = False
+        state.last_direction = -1
+    elif inputs.right and not inputs.left:
+        move = MOVE_SPEED
+        is_moving_horizontally = True
+        body.facing_right = True
+        state.last_direction = 1
+    else:
+        body.facing_right = (state.last_direction == 1)
+
+    next_x = body.x + move
+    if next_x - body.width / 2 < WORLD_LEFT:
+        move = 0
+        body.x = WORLD_LEFT + body.width / 2
+    elif next_x + body.width / 2 > WORLD_RIGHT:
+        move = 0
+        body.x = WORLD_RIGHT - body.width / 2
+
+    body.change_x = move
+    contacts = physics.resolve_contacts(body, GROUND_CHECK_DISTANCE)
+    on_ladder = contacts.on_ladder
+    if not on_ladder:
+        platform = entities.support(body.rect(), GROUND_CHECK_DISTANCE)
+        if platform >= 0:
+            entities.carry(body, platform)
+            contacts.grounded = True
+
+    if on_ladder:
+        if inputs.up and not inputs.down:
+            if body.y + LADDER_SPEED + body.height / 2 > WORLD_TOP:
+                body.change_y = 0
+                body.y = WORLD_TOP - body.height / 2
+            else:
+                body.change_y = LADDER_SPEED
+            is_moving_on_ladder = True
+        elif inputs.down and not inputs.up:
+            if body.y - LADDER_SPEED - body.height / 2 < WORLD_BOTTOM:
+                body.change_y = 0
+                body.y = WORLD_BOTTOM + body.height / 2
+            else:
+                body.change_y = -LADDER_SPEED
+            is_moving_on_ladder = True
+        else:
+            body.change_y = 0
+
+    grounded = contacts.grounded
+    state.walking = (is_moving_horizontally and grounded and not on_ladder and not state.was_jumping)
+
+    if not on_ladder:
+        if not state.was_jumping and body.change_y > 0:
+            events.append(("jump", body.x, body.y))
+            state.was_jumping = True
+        elif state.was_jumping and grounded:
+            events.append(("land", body.x, body.y))
+            state.was_jumping = False
+
+        if grounded:
+            state.time_since_ground = 0
+            state.jumps_left = MAX_JUMPS
+        else:
+            state.time_since_ground += dt
+
+        if state.jump_buffer_timer > 0:
+            state.jump_buffer_timer -= dt
+
+        want_jump = inputs.jump or (state.jump_buffer_timer > 0)
+        if want_jump:
+            can_coyote = (state.time_since_ground <= COYOTE_TIME)
+            if grounded or can_coyote:
+                body.change_y = JUMP_SPEED
+                state.jump_buffer_timer = 0
+    else:
+        state.was_jumping = True
+        state.time_since_ground = 0
+    profiler.lap("movement")
+
+    bottom_before = body.rect()[1]
+    physics.update(body)
+    entities.land(body, bottom_before)
+
+    if body.y - body.height / 2 < WORLD_BOTTOM:
+        body.y = WORLD_BOTTOM + body.height / 2
+        body.change_y = 0
+        if body.y < WORLD_BOTTOM + 100:
+            body.x, body.y = state.geometry.spawn
+            events.append(("respawn",))
+
+    if body.y + body.height / 2 > WORLD_TOP:
+        body.y = WORLD_TOP - body.height / 2
+        body.change_y = 0
+    profiler.lap("physics")
+
+    state.grounded = grounded
+    state.on_ladder = on_ladder
+    state.moving = is_moving_horizontally
+    state.moving_on_ladder = is_moving_on_ladder
+    state.jumping = (body.change_y > 0 and not on_ladder)
+
+    entered, exited = state.triggers.update(body.rect())
+    hazard_hit = False
+    for kind, index in entered:
+        events.append(("enter", kind, index))
+        if kind == "keys" and state.keys_alive[index]:
+            state.keys_alive[index] = False
+            state.triggers.remove(kind, index)
+            events.append(("key", index))
+        elif kind == "hazards":
+            hazard_hit = True
+    for kind, index in exited:
+        events.append(("exit", kind, index))
+    if entities.hazard_hit(body.rect()):
+        hazard_hit = True
+
+    if not any(state.keys_alive) and state.triggers.is_active("doors"):
+        events.append(("door",))
+
+    if hazard_hit:
+        body.x, body.y = state.geometry.spawn
+        body.change_x = 0
+        body.change_y = 0
+        events.append(("respawn",))
+    profiler.lap("triggers")
+
+    update_camera(state)
+    profiler.lap("camera")
+    return events
+
+
+def run(state, inputs_sequence, dt):
+    """Прогоняет последовательность входов без окна; удобно для тестов и проверки уровней"""
+    for inputs in inputs_sequence:
+        step(state, inputs, dt)
+        if any(event[0] == "door" for event in state.events):
+            break
+    return state
@@ -0,0 +1,105 @@
+import math
+
+import arcade
+from arcade.camera import Camera2D
+
+from background import get_quad, visible_bounds
+
+
+class StaticLayerCache:
+    """Неподвижные слои уровня, заранее отрисованные в текстуры размером с экран.
+
+    Каждый кадр рисуются только те куски, которые попадают в камеру, поэтому
+    стоимость кадра не зависит от количества статичных тайлов.
+    """
+
+    def __init__(self, world_bounds, chunk_size):
+        self.world_bounds = world_bounds
+        self.chunk_size = chunk_size
+        self.layers = []
+        self.chunks = {}
+        self.valid = False
+
+    def set_layers(self, layers):
+        self.layers = list(layers)
+        self.invalidate()
+
+    def invalidate(self):
+        self.chunks.clear()
+        self.valid = False
+
+    def chunk_range(self, left, right, bottom, top):
+        world_left, world_right, world_bottom, world_top = self.world_bounds
+        chunk_w, chunk_h = self.chunk_size
+        x0 = int((left - world_left) // chunk_w)
+        x1 = int(math.ceil((right - world_left) / chunk_w))
+        y0 = int((bottom - world_bottom) // chunk_h)
+        y1 = int(math.ceil((top - world_bottom) / chunk_h))
+        return range(max(x0, 0), x1), range(max(y0, 0), y1)
+
+    def chunk_bounds(self, ix, iy):
+        world_left, world_right, world_bottom, world_top = self.world_bounds
+        chunk_w, chunk_h = self.chunk_size
+        left = world_left + ix * chunk_w
+        bottom = world_bottom + iy * chunk_h
+        return left, left + chunk_w, bottom, bottom + chunk_h
+
+    def build(self, ctx):
+        world_left, world_right, world_bottom, world_top = self.world_bounds
+        chunk_w, chunk_h = self.chunk_size
+        xs, ys = self.chunk_range(world_left, world_right, world_bottom, world_top)
+
+        # Цвет смешивается как обычно, а альфа накапливается для последующего
+        # вывода с premultiplied alpha. SpriteList.draw сам ставит BLEND_DEFAULT,
+        # если функцию смешивания не передать явно
+        blend_func = ctx.SRC_ALPHA, ctx.ONE_MINUS_SRC_ALPHA, ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA
+        previous_blend = ctx.blend_func
+        try:
+            for ix in xs:
+                for iy in ys:
+                    left, right, bottom, top = self.chunk_bounds(ix, iy)
+                    texture = ctx.texture(
+                        (chunk_w, chunk_h), components=4,
+                        wrap_x=ctx.CLAMP_TO_EDGE, wrap_y=ctx.CLAMP_TO_EDGE
+                    )
+                    framebuffer = ctx.framebuffer(color_attachments=[texture])
+                    camera = Camera2D(
+                        viewport=arcade.LBWH(0, 0, chunk_w, chunk_h),
+                        position=((left + right) / 2, (bottom + top) / 2),
+                        render_target=framebuffer
+                    )
+                    with camera.activate(), ctx.enabled(ctx.BLEND):
+                        framebuffer.clear()
+                        for sprites in self.layers:
+                            sprites.draw(blend_function=blend_func)
+                    self.chunks[(ix, iy)] = texture
+        finally:
+            ctx.blend_func = previous_blend
+        self.valid = True
+
+    def draw(self, camera):
+        visible = visible_bounds(camera, self.world_bounds)
+        if visible is None or not self.layers:
+            return
+
+        ctx = arcade.get_window().ctx
+        if not self.valid:
+            self.build(ctx)
+
+        quad = get_quad(ctx)
+        xs, ys = self.chunk_range(*visible)
+        for ix in xs:
+            for iy in ys:
+                texture = self.chunks.get((ix, iy))
+                if texture is None:
+                    continue
+                left, right, bottom, top = self.chunk_bounds(ix, iy)
+                # Цвет в кусках уже умножен на альфу, поэтому источник берется с весом ONE.
+                # BLEND_PREMULTIPLIED_ALPHA в arcade - это (SRC_ALPHA, ONE), то есть сложение
+                quad.draw(
+                    texture,
+                    max(left, visible[0]), min(right, visible[1]),
+                    max(bottom, visible[2]), min(top, visible[3]),
+                    (left, bottom), self.chunk_size,
+                    blend_func=(ctx.ONE, ctx.ONE_MINUS_SRC_ALPHA)
+                )
@@ -0,0 +1,114 @@
+import threading
+from pathlib import Path
+
+import arcade
+from arcade.texture import ImageData
+from PIL import Image
+
+from assets_pack import open_image
+from bake import baked_entry
+
+
+def load_texture(path):
+    """Как arcade.load_texture, но читает картинку из пакета ресурсов, если она там есть"""
+    image = open_image(path)
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    texture = arcade.Texture(ImageData(image))
+    texture.file_path = Path(path)
+    return texture
+
+
+def flipped_image(path):
+    return open_image(path).convert("RGBA").transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+
+
+class TextureRegistry:
+    """Общий реестр текстур: каждый путь загружается один раз.
+
+    Если для пути есть запеченная копия (см. bake.py), загружается она, а
+    bake_scale() сообщает, во сколько раз она меньше оригинала по каждой оси.
+    """
+
+    def __init__(self):
+        self.textures = {}
+        self.gl_textures = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        texture = self.textures.get(path)
+        if texture is not None:
+            self.hits += 1
+            return texture
+
+        # Декодирование идет без блокировки, чтобы фоновая подгрузка уровня не тормозила кадр
+        entry = baked_entry(path)
+        texture = load_texture(entry["file"] if entry else path)
+        with self.lock:
+            self.misses += 1
+            return self.textures.setdefault(path, texture)
+
+    def get_repeating(self, path):
+        """OpenGL-текстура с режимом повтора; создается только в главном потоке"""
+        texture = self.gl_textures.get(path)
+        if texture is None:
+            image = self.get(path).image.convert("RGBA").transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+            ctx = arcade.get_window().ctx
+            texture = ctx.texture(
+                image.size, components=4, data=image.tobytes(),
+                wrap_x=ctx.REPEAT, wrap_y=ctx.REPEAT
+            )
+            entry = baked_entry(path)
+            mipmaps = entry.get("mipmaps") if entry else None
+            if mipmaps:
+                # glGenerateMipmap выделяет уровни, затем они заменяются запеченными
+                texture.build_mipmaps(max_level=len(mipmaps))
+                for level, mip_path in enumerate(mipmaps, 1):
+                    mip = flipped_image(mip_path)
+                    # Без viewport arcade сверяет размер данных с нулевым уровнем
+                    texture.write(mip.tobytes(), level=level, viewport=mip.size)
+                texture.filter = ctx.LINEAR_MIPMAP_LINEAR, ctx.LINEAR
+            self.gl_textures[path] = texture
+        return texture
+
+    def bake_scale(self, path):
+        """Отношение (x, y) размеров загруженной текстуры и исходной картинки"""
+        entry = baked_entry(path)
+        if not entry:
+            return 1.0, 1.0
+        (width, height), (source_width, source_height) = entry["size"], entry["source_size"]
+        return width / source_width, height / source_height
+
+    def discard(self, paths):
+        with self.lock:
+            for path in paths:
+                self.textures.pop(path, None)
+                self.gl_textures.pop(path, None)
+
+    def size_in_bytes(self, paths):
+        total = 0
+        for path in paths:
+            texture = self.textures.get(path)
+            if texture is not None:
+                total += texture.width * texture.height * 4
+        return total
+
+    def stats(self):
+        return {
+            'textures': len(self.textures),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def clear(self):
+        with self.lock:
+            self.textures.clear()
+            self.gl_textures.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Создаем экземпляр реестра текстур
+textures = TextureRegistry()
@@ -0,0 +1,73 @@
+"""Индекс интерактивных областей уровня: ключи, двери, лестницы и опасности.
+
+Все триггеры лежат в одной равномерной сетке, поэтому проверка игрока стоит
+одинаково для пяти триггеров и для пяти тысяч: смотрятся только ячейки под ним.
+"""
+from collision import grid_cells, overlaps
+from physics import CELL_SIZE
+
+TRIGGER_KINDS = ("keys", "doors", "ladders", "hazards")
+
+
+class TriggerIndex:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.triggers = {}
+        # Триггеры, с которыми игрок пересекался на прошлой проверке
+        self.active = set()
+
+    @classmethod
+    def from_geometry(cls, geometry, keys_alive=None, cell_size=CELL_SIZE):
+        index = cls(cell_size)
+        for kind in TRIGGER_KINDS:
+            for i, rect in enumerate(getattr(geometry, kind)):
+                if kind == "keys" and keys_alive is not None and not keys_alive[i]:
+                    continue
+                index.add(kind, i, rect)
+        return index
+
+    def add(self, kind, index, rect):
+        trigger = (kind, index)
+        self.triggers[trigger] = rect
+        for cell in grid_cells(rect, self.cell_size):
+            self.cells.setdefault(cell, []).append(trigger)
+
+    def remove(self, kind, index):
+        trigger = (kind, index)
+        rect = self.triggers.pop(trigger, None)
+        if rect is None:
+            return
+        for cell in grid_cells(rect, self.cell_size):
+            bucket = self.cells.get(cell)
+            if bucket and trigger in bucket:
+                bucket.remove(trigger)
+        self.active.discard(trigger)
+
+    def query(self, rect, kind=None):
+        found = set()
+        for cell in grid_cells(rect, self.cell_size):
+            for trigger in self.cells.get(cell, ()):
+                if trigger in found or (kind is not None and trigger[0] != kind):
+                    continue
+                if overlaps(rect, self.triggers[trigger]):
+                    found.add(trigger)
+        return found
+
+    def any(self, rect, kind):
+        for cell in grid_cells(rect, self.cell_size):
+            for trigger in self.cells.get(cell, ()):
+                if trigger[0] == kind and overlaps(rect, self.triggers[trigger]):
+                    return True
+        return False
+
+    def update(self, rect):
+        """Обновляет набор активных триггеров и возвращает (вошли, вышли)"""
+        current = self.query(rect)
+        entered = sorted(current - self.active)
+        exited = sorted(self.active - current)
+        self.active = current
+        return entered, exited
+
+    def is_active(self, kind):
+        return any(trigger[0] == kind for trigger in self.active)
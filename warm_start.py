@@ -0,0 +1,42 @@
+"""Протокол между лаунчером и заранее запущенным процессом игры.
+
+Лаунчер запускает game.py --serve, пока показывает меню. Процесс игры
+импортирует arcade, загружает уровни и текстуры со скрытым окном и пишет в
+stdout READY. По кнопке Start лаунчер пишет в stdin START; игра показывает
+окно, сообщает RUNNING после первого кадра и EXIT при выходе. QUIT просит
+прогретый процесс завершиться, не начиная игру.
+
+Сообщения - отдельные строки с префиксом PREFIX, чтобы их можно было отличить
+от обычного вывода игры.
+"""
+import sys
+
+PREFIX = "@etc "
+
+READY = "ready"
+RUNNING = "running"
+EXIT = "exit"
+START = "start"
+QUIT = "quit"
+
+
+def send(message):
+    sys.stdout.write(PREFIX + message + "\n")
+    sys.stdout.flush()
+
+
+def wait_for_command():
+    """Блокирует до следующей команды лаунчера; закрытый stdin считается QUIT"""
+    for line in sys.stdin:
+        command = line.strip()
+        if command in (START, QUIT):
+            return command
+    return QUIT
+
+
+def parse(line):
+    """Возвращает сообщение протокола из строки вывода игры или None"""
+    line = line.strip()
+    if line.startswith(PREFIX):
+        return line[len(PREFIX):]
+    return None
@@ -0,0 +1,88 @@
+"""Общий атлас для спрайтов мира.
+
+arcade по умолчанию кладет все текстуры в ctx.default_atlas размером 512x512,
+который при переполнении удваивается и перестраивается целиком, причем
+происходит это посреди уровня, когда спрайт впервые попадает в список. Здесь
+у спрайтов мира свой атлас: при создании в него кладутся кадры игрока, а
+текстуры уровня добавляются пачкой при загрузке уровня, до того как спрайты
+попадут в списки. Если пачка не помещается, атлас один раз увеличивается до
+нужного размера, который подбирается тем же распределителем полос, что
+использует arcade. Все списки спрайтов мира создаются с этим атласом, поэтому
+проход по миру использует одну текстуру. Интерфейс остается в атласе по
+умолчанию.
+
+Атлас не держит сильных ссылок на текстуры: когда выгруженный уровень
+отпускает свои спрайты, а реестр - текстуры, arcade освобождает их области,
+и место переиспользуется при следующей перестройке атласа.
+"""
+from arcade.texture_atlas import DefaultTextureAtlas
+from pyglet.image.atlas import Allocator, AllocatorException
+
+ATLAS_BORDER = 2
+MIN_ATLAS_SIZE = 256
+MAX_ATLAS_SIZE = 4096
+
+
+def unique_images(texture_list):
+    images = {}
+    for texture in texture_list:
+        images.setdefault(texture.image_data.hash, texture.image_data.image.size)
+    return list(images.values())
+
+
+def fits(sizes, side, border=ATLAS_BORDER):
+    allocator = Allocator(side, side)
+    try:
+        for width, height in sorted(sizes, key=lambda size: size[1], reverse=True):
+            allocator.alloc(width + border * 2, height + border * 2)
+    except AllocatorException:
+        return False
+    return True
+
+
+def atlas_side(sizes, border=ATLAS_BORDER, side=MIN_ATLAS_SIZE):
+    """Наименьшая сторона квадратного атласа (степень двойки), в которую влезают все картинки"""
+    while side < MAX_ATLAS_SIZE and not fits(sizes, side, border):
+        side *= 2
+    return side
+
+
+def by_height(texture_list):
+    # Распределитель полос лучше всего заполняется картинками по убыванию высоты
+    return sorted(texture_list, key=lambda texture: texture.image_data.image.height, reverse=True)
+
+
+class WorldAtlas:
+    def __init__(self, ctx, texture_list=()):
+        texture_list = list(texture_list)
+        side = atlas_side(unique_images(texture_list))
+        # auto_resize остается на случай текстур, добавленных в обход add()
+        self.atlas = DefaultTextureAtlas((side, side), border=ATLAS_BORDER, ctx=ctx)
+        self.add(texture_list)
+
+    @property
+    def size(self):
+        return self.atlas.size
+
+    def add(self, texture_list):
+        """Добавляет текстуры, заранее увеличив атлас, если они не помещаются"""
+        atlas = self.atlas
+        texture_list = [texture for texture in texture_list if not atlas.has_texture(texture)]
+        if not texture_list:
+            return
+        new_images = [texture for texture in texture_list if not atlas.has_image(texture.image_data)]
+        if new_images:
+            sizes = [image.image.size for image in atlas.images] + unique_images(new_images)
+            side = atlas_side(sizes, side=atlas.width)
+            if side > atlas.width:
+                atlas.resize((side, side))
+        for texture in by_height(texture_list):
+            atlas.add(texture)
+
+
+def create_world_atlas(ctx, animation_clips=(), texture_list=()):
+    """Атлас с кадрами анимаций и отдельными текстурами; текстуры уровней добавляет Level"""
+    texture_list = list(texture_list)
+    for clip in animation_clips:
+        texture_list += clip.frames + clip.mirrored
+    return WorldAtlas(ctx, texture_list)